@@ -1,6 +1,8 @@
 import subprocess
 import sys
 import os
+import socket
+import time
 
 def install_requirements():
     print("Instaluji zavislosti z requirements.txt...")
@@ -9,20 +11,36 @@ def install_requirements():
     except subprocess.CalledProcessError:
         print("Chyba pri instalaci knihoven. Pokracuji...")
 
+def start_task_service():
+    """Spustí daemon se sdíleným stavem úkolů a počká, až začne naslouchat"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("Daemon neni na tomto systemu podporovan, aplikace pobezi samostatne.")
+        return
+    from taks_priority_solver import SERVICE_SOCKET
+    print("Spoustim daemon se sdilenym stavem ukolu...")
+    subprocess.Popen([sys.executable, "task_service.py"])
+    for _ in range(50):
+        if os.path.exists(SERVICE_SOCKET):
+            return
+        time.sleep(0.1)
+    print("Daemon se nespustil vcas, aplikace pobezi samostatne.")
+
 def run_scripts():
     print("Spoustim aplikace...")
     
     # Cesta k interpretu Pythonu
     python_exe = sys.executable
+    # Měření výkonu (--profile) předáme oběma aplikacím
+    extra_args = ["--profile"] if "--profile" in sys.argv else []
 
     # Spuštění skriptů jako samostatné procesy
     # Na Windows používáme creationflags, aby se otevřela nová okna (pokud je to potřeba)
     if os.name == 'nt': # Windows
-        subprocess.Popen([python_exe, "date_reminder.py"], creationflags=subprocess.CREATE_NEW_CONSOLE)
-        subprocess.Popen([python_exe, "taks_priority_solver.py"], creationflags=subprocess.CREATE_NEW_CONSOLE)
+        subprocess.Popen([python_exe, "date_reminder.py"] + extra_args, creationflags=subprocess.CREATE_NEW_CONSOLE)
+        subprocess.Popen([python_exe, "taks_priority_solver.py"] + extra_args, creationflags=subprocess.CREATE_NEW_CONSOLE)
     else: # Mac / Linux
-        subprocess.Popen([python_exe, "date_reminder.py"])
-        subprocess.Popen([python_exe, "taks_priority_solver.py"])
+        subprocess.Popen([python_exe, "date_reminder.py"] + extra_args)
+        subprocess.Popen([python_exe, "taks_priority_solver.py"] + extra_args)
 
 if __name__ == "__main__":
     # 1. Zkontroluje a nainstaluje requirements
@@ -31,5 +49,9 @@ if __name__ == "__main__":
     else:
         print("Soubor requirements.txt nenalezen, preskakuji instalaci.")
 
-    # 2. Spustí oba skripty
+    # 2. Volitelně spustí daemon, přes který oba skripty sdílí stav úkolů
+    if "--daemon" in sys.argv:
+        start_task_service()
+
+    # 3. Spustí oba skripty
     run_scripts()
\ No newline at end of file
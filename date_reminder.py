@@ -4,7 +4,13 @@ import requests
 import datetime
 import os
 import threading
+import queue
 import re
+import json
+import instrumentation
+from instrumentation import instrumented
+from deadline_notifier import DeadlineNotifier, KIND_DEADLINE_TOMORROW, KIND_DEADLINE_TODAY, KIND_DEADLINE_OVERDUE
+from taks_priority_solver import DATA_FILE as TASKS_FILE, TaskFileWatcher, TaskServiceClient
 
 class StickyNote(tk.Toplevel):
     """
@@ -35,6 +41,7 @@ class StickyNote(tk.Toplevel):
         self.parse_markdown()
         self.text_area.configure(state="disabled")
 
+    @instrumented("parse_markdown")
     def parse_markdown(self):
         count_lines = int(self.text_area.index('end-1c').split('.')[0])
         for i in range(1, count_lines + 1):
@@ -56,6 +63,40 @@ class StickyNote(tk.Toplevel):
             self.text_area.tag_add("italic", start, end)
 
 
+class DeadlineReminder(tk.Toplevel):
+    """
+    Malé okno s upozorněními na blížící se deadliny nebo konec watchlistu.
+    Upozornění, která přijdou naráz (např. po spuštění), se ukážou v jednom okně.
+    """
+    MAX_LINES = 10
+
+    def __init__(self, master, reminders):
+        super().__init__(master)
+        self.title("Upozornění na úkoly")
+        self.minsize(320, 150)
+        self.configure(bg="#ffcdd2")
+        self.attributes("-topmost", True)
+
+        lines = [self.reminder_text(task, kind) for task, kind in reminders[:self.MAX_LINES]]
+        if len(reminders) > self.MAX_LINES:
+            lines.append(f"… a dalších {len(reminders) - self.MAX_LINES}")
+
+        tk.Label(self, text="\n\n".join(lines), bg="#ffcdd2", font=("Arial", 11, "bold"),
+                 wraplength=290, justify="center").pack(expand=True, fill="both", padx=10, pady=10)
+        tk.Button(self, text="OK", command=self.destroy, bg="#ef9a9a", relief="flat").pack(fill="x", padx=5, pady=5)
+        self.bell()
+
+    @staticmethod
+    def reminder_text(task, kind):
+        if kind == KIND_DEADLINE_TOMORROW:
+            return f"Zítra je deadline úkolu:\n{task['title']}"
+        if kind == KIND_DEADLINE_TODAY:
+            return f"Dnes je deadline úkolu:\n{task['title']}"
+        if kind == KIND_DEADLINE_OVERDUE:
+            return f"Úkol je po deadlinu:\n{task['title']}"
+        return f"Zítra se uzavře watchlist úkolu:\n{task['title']}"
+
+
 class NoteEditor(tk.Toplevel):
     """
     Okno pro psaní strukturované poznámky.
@@ -110,6 +151,64 @@ class NoteEditor(tk.Toplevel):
             messagebox.showwarning("Prázdné", "Poznámka je prázdná.")
 
 
+class NoteIOWorker:
+    """
+    Čtení a zápis poznámky ve vlastním vlákně, aby disk (síťový home) neblokoval okno.
+    Výsledky se vrací do hlavního vlákna přes root.after. Zápis je atomický
+    (dočasný soubor + os.replace) a opakovaná uložení stejného souboru se slučují - zapíše
+    se jen poslední obsah.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending_writes = {} # cesta -> (obsah, callback) čekající na zápis
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def read(self, path, callback):
+        """callback(obsah, chyba) - obsah je None, pokud soubor neexistuje"""
+        self.jobs.put((self._read, path, callback))
+
+    def write(self, path, content, callback):
+        """callback(chyba) - při sloučení se zavolá jen callback posledního uložení"""
+        with self.lock:
+            already_queued = path in self.pending_writes
+            self.pending_writes[path] = (content, callback)
+        if not already_queued:
+            self.jobs.put((self._write, path, None))
+
+    def _run(self):
+        while True:
+            job, path, callback = self.jobs.get()
+            job(path, callback)
+
+    def _read(self, path, callback):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            result = (content, None)
+        except FileNotFoundError:
+            result = (None, None)
+        except Exception as e:
+            result = (None, e)
+        self.root.after(0, lambda: callback(*result))
+
+    def _write(self, path, callback):
+        with self.lock:
+            content, callback = self.pending_writes.pop(path)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            error = None
+        except Exception as e:
+            error = e
+        self.root.after(0, lambda: callback(error))
+
+
 class WorkDayApp:
     def __init__(self, root):
         self.root = root
@@ -119,12 +218,25 @@ class WorkDayApp:
         self.countdown_time = datetime.timedelta(hours=7)
         self.countdown_running = False
         self.note_file = "poznamka.txt"
+        self.reminders_file = "upozorneni.json" # která upozornění už dnes byla ukázána
+        self.note_io = NoteIOWorker(self.root)
 
         self.create_widgets()
         self.update_clock()
+        # Hlídání zaseknutí Tk smyčky (dlouhé I/O v hlavním vlákně apod.)
+        self.lag_monitor = instrumentation.start_lag_monitor(self.root)
         threading.Thread(target=self.fetch_svatek_api, daemon=True).start()
         self.check_existing_note()
 
+        # Upozornění na deadliny z Task Priority Solveru
+        self.known_tasks = {}
+        self.shown_reminders = {"date": None, "shown": []}
+        self.pending_reminders = [] # (úkol, druh) čekající na společné okno
+        self.reminders_lock = threading.Lock()
+        self.notifier = DeadlineNotifier(self.on_deadline_event)
+        self.notifier.start()
+        threading.Thread(target=self.start_task_events, daemon=True).start()
+
     def create_widgets(self):
         style = ttk.Style()
         style.configure("TButton", font=("Helvetica", 10), padding=5)
@@ -172,6 +284,7 @@ class WorkDayApp:
         self.time_label.config(text=now.strftime("%H:%M:%S"))
         self.root.after(1000, self.update_clock)
 
+    @instrumented("fetch_svatek_api")
     def fetch_svatek_api(self):
         url = "https://svatkyapi.cz/api/day"
         try:
@@ -214,39 +327,131 @@ class WorkDayApp:
         NoteEditor(self.root, self.save_note_to_file)
 
     def save_note_to_file(self, content):
-        try:
-            with open(self.note_file, "w", encoding="utf-8") as f:
-                f.write(content)
+        self.note_io.write(self.note_file, content, self.on_note_saved)
+
+    def on_note_saved(self, error):
+        if error is None:
             messagebox.showinfo("Uloženo", "Poznámka byla uložena na příště.")
-        except Exception as e:
-            messagebox.showerror("Chyba", f"Nepodařilo se uložit soubor: {e}")
+        else:
+            messagebox.showerror("Chyba", f"Nepodařilo se uložit soubor: {error}")
 
     def show_reminder(self):
         """Manuální zobrazení uložené poznámky"""
-        if os.path.exists(self.note_file):
-            try:
-                with open(self.note_file, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                if content:
-                    StickyNote(self.root, content)
-                else:
-                    messagebox.showinfo("Info", "Poznámka je prázdná.")
-            except Exception as e:
-                messagebox.showerror("Chyba", f"Nepodařilo se načíst poznámku: {e}")
+        self.note_io.read(self.note_file, self.on_reminder_loaded)
+
+    def on_reminder_loaded(self, content, error):
+        if error is not None:
+            messagebox.showerror("Chyba", f"Nepodařilo se načíst poznámku: {error}")
+        elif content is None:
+            messagebox.showinfo("Info", "Zatím žádná poznámka neexistuje.")
+        elif content.strip():
+            StickyNote(self.root, content.strip())
         else:
-             messagebox.showinfo("Info", "Zatím žádná poznámka neexistuje.")
+            messagebox.showinfo("Info", "Poznámka je prázdná.")
 
     def check_existing_note(self):
-        if os.path.exists(self.note_file):
+        def on_loaded(content, error):
+            if content and content.strip():
+                StickyNote(self.root, content.strip())
+        self.note_io.read(self.note_file, on_loaded)
+
+    # --- UPOZORNĚNÍ NA DEADLINY ---
+    # Úkoly se čtou mimo hlavní vlákno (tasks.json může být velký nebo na síťovém disku).
+    # Tk se nedotýkají - notifier je thread-safe a known_tasks používá jen vlákno watcheru.
+    def start_task_events(self):
+        """Ve vlastním vlákně - první načtení úkolů a zapojení odběru změn"""
+        # Před rebuild(), který může hned spustit dnešní zmeškaná upozornění
+        self.shown_reminders = self.load_shown_reminders()
+        self.task_client = TaskServiceClient.connect()
+        if self.task_client is not None:
             try:
-                with open(self.note_file, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                if content:
-                    StickyNote(self.root, content)
-            except Exception:
-                pass
+                # Běží daemon - úkoly dostaneme z jeho paměti a změny jako push
+                self.notifier.rebuild(self.task_client.subscribe())
+                self.task_client.listen(self.on_remote_task_changes)
+                return
+            except (OSError, ValueError, KeyError):
+                self.task_client = None
+        self.notifier.rebuild(self.load_known_tasks())
+        # Callback běží ve vlákně watcheru, takže i opakované čtení je mimo hlavní vlákno
+        self.task_watcher = TaskFileWatcher(TASKS_FILE, self.reload_task_events)
+        self.task_watcher.start()
+
+    def read_tasks_file(self):
+        try:
+            with open(TASKS_FILE, "r", encoding="utf-8") as f:
+                return [t for t in json.load(f) if "id" in t]
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def load_known_tasks(self):
+        tasks = self.read_tasks_file() or []
+        self.known_tasks = {t["id"]: t for t in tasks}
+        return tasks
+
+    def reload_task_events(self):
+        """Po změně tasks.json přeplánuje jen změněné úkoly (každý O(log n))"""
+        tasks = self.read_tasks_file()
+        if tasks is None:
+            return
+        new_tasks = {t["id"]: t for t in tasks}
+        for task_id, task in new_tasks.items():
+            if self.known_tasks.get(task_id) != task:
+                self.notifier.update_task(task)
+        for task_id in self.known_tasks.keys() - new_tasks.keys():
+            self.notifier.remove_task(task_id)
+        self.known_tasks = new_tasks
+
+    def on_remote_task_changes(self, tasks, removed_ids):
+        # Volá čtečka daemonu z vlastního vlákna - notifier je thread-safe
+        for task in tasks:
+            self.notifier.update_task(task)
+        for task_id in removed_ids:
+            self.notifier.remove_task(task_id)
+
+    def load_shown_reminders(self):
+        try:
+            with open(self.reminders_file, "r", encoding="utf-8") as f:
+                shown = json.load(f)
+            if isinstance(shown, dict) and isinstance(shown.get("shown"), list):
+                return shown
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {"date": None, "shown": []}
+
+    def on_deadline_event(self, task, kind):
+        # Volá se z vlákna notifikátoru - upozornění, která přijdou naráz, sloučíme do jednoho okna
+        with self.reminders_lock:
+            first = not self.pending_reminders
+            self.pending_reminders.append((task, kind))
+        if first:
+            self.root.after(300, self.show_pending_reminders)
+
+    def show_pending_reminders(self):
+        with self.reminders_lock:
+            reminders, self.pending_reminders = self.pending_reminders, []
+        today = datetime.date.today().isoformat()
+        if self.shown_reminders["date"] != today:
+            self.shown_reminders = {"date": today, "shown": []}
+        shown = set(self.shown_reminders["shown"])
+        # Každé upozornění nejvýš jednou za den, ani po restartu aplikace
+        new = []
+        for task, kind in reminders:
+            key = f"{task['id']}:{kind}"
+            if key not in shown:
+                shown.add(key)
+                new.append((task, kind))
+        if not new:
+            return
+        self.shown_reminders["shown"] = sorted(shown)
+        self.note_io.write(self.reminders_file, json.dumps(self.shown_reminders, ensure_ascii=False), self.on_reminders_saved)
+        DeadlineReminder(self.root, new)
+
+    def on_reminders_saved(self, error):
+        if error:
+            print(f"Nelze uložit stav upozornění: {error}")
 
 if __name__ == "__main__":
     root = tk.Tk()
+    instrumentation.install(root)
     app = WorkDayApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Kdy během dne upozorňovat (hodina)
+NOTIFY_HOUR = 9
+# Watchlist se automaticky uzavírá po 14 dnech (viz TaskManager.check_watchlist_timeout)
+WATCHLIST_TIMEOUT_DAYS = 14
+# Nejdelší spánek vlákna - pojistka proti posunu hodin / uspání počítače
+MAX_SLEEP = 3600
+
+# Druhy upozornění
+KIND_DEADLINE_TOMORROW = "deadline_tomorrow"
+KIND_DEADLINE_TODAY = "deadline_today"
+KIND_WATCHLIST_EXPIRY = "watchlist_expiry"
+KIND_DEADLINE_OVERDUE = "deadline_overdue"
+
+
+def task_events(task):
+    """Vrátí seznam (čas, druh) upozornění pro úkol podle jeho stavu"""
+    if task.get("completed_date"):
+        return []
+
+    def at_notify_hour(date_str, days_offset=0):
+        day = datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=days_offset)
+        return day.replace(hour=NOTIFY_HOUR).timestamp()
+
+    try:
+        if task.get("watchlist_date"):
+            # Den před automatickým uzavřením watchlistu
+            return [(at_notify_hour(task["watchlist_date"], WATCHLIST_TIMEOUT_DAYS - 1), KIND_WATCHLIST_EXPIRY)]
+        today = datetime.now().strftime("%Y-%m-%d")
+        if at_notify_hour(task["deadline"]) < at_notify_hour(today):
+            # Po deadlinu - připomeneme jednou, dnes v NOTIFY_HOUR
+            return [(at_notify_hour(today), KIND_DEADLINE_OVERDUE)]
+        return [
+            (at_notify_hour(task["deadline"], -1), KIND_DEADLINE_TOMORROW),
+            (at_notify_hour(task["deadline"]), KIND_DEADLINE_TODAY),
+        ]
+    except (KeyError, TypeError, ValueError):
+        return []
+
+
+class DeadlineNotifier:
+    """
+    Plánovač upozornění na blížící se deadliny a konec watchlistu.
+    Události drží v min-haldě, vlákno spí až do nejbližší z nich (nepolluje).
+    Změna úkolu je O(log n) - staré záznamy se jen zneplatní (lazy deletion).
+    Callback on_notify(task, kind) se volá z vlákna notifikátoru.
+    """
+    def __init__(self, on_notify):
+        self.on_notify = on_notify
+        self._heap = []      # [čas, pořadí, id, druh, úkol, platný]
+        self._entries = {}   # id -> seznam záznamů v haldě
+        self._live = 0       # počet platných záznamů v haldě
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    def rebuild(self, tasks):
+        """
+        Postaví haldu znovu z celého seznamu úkolů - O(n). Dnešní události, které už
+        prošly (aplikace spuštěná po NOTIFY_HOUR), se v haldě nechají a spustí se hned.
+        """
+        with self._cond:
+            self._heap = []
+            self._entries = {}
+            start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+            for task in tasks:
+                entries = self._make_entries(task, start_of_day)
+                if entries:
+                    self._entries[task["id"]] = entries
+                    self._heap.extend(entries)
+            heapq.heapify(self._heap)
+            self._live = len(self._heap)
+            self._cond.notify()
+
+    def update_task(self, task):
+        """Přeplánuje upozornění jednoho úkolu - O(log n)"""
+        with self._cond:
+            self._invalidate(task["id"])
+            entries = self._make_entries(task, time.time())
+            if entries:
+                self._entries[task["id"]] = entries
+                self._live += len(entries)
+                for entry in entries:
+                    heapq.heappush(self._heap, entry)
+                # Probudíme vlákno, pokud je nová událost dřív než ta, na kterou čeká
+                if self._heap[0] in entries:
+                    self._cond.notify()
+            self._compact()
+
+    def remove_task(self, task_id):
+        with self._cond:
+            self._invalidate(task_id)
+            self._compact()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+
+    # --- interní ---
+
+    def _make_entries(self, task, since):
+        """Záznamy událostí úkolu po čase since (starší se zahodí)"""
+        return [[when, next(self._counter), task["id"], kind, task, True]
+                for when, kind in task_events(task) if when > since]
+
+    def _invalidate(self, task_id):
+        entries = self._entries.pop(task_id, [])
+        for entry in entries:
+            entry[5] = False
+        self._live -= len(entries)
+
+    def _compact(self):
+        """Když zneplatněné záznamy převáží platné, haldu pročistíme (amortizovaně O(1))"""
+        if len(self._heap) > 2 * self._live + 64:
+            self._heap = [entry for entry in self._heap if entry[5]]
+            heapq.heapify(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop:
+                    while self._heap and not self._heap[0][5]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(min(delay, MAX_SLEEP))
+                if self._stop:
+                    return
+                entry = heapq.heappop(self._heap)
+                entries = self._entries.get(entry[2], [])
+                if entry in entries:
+                    entries.remove(entry)
+                    self._live -= 1
+                    if not entries:
+                        del self._entries[entry[2]]
+            # Callback mimo zámek, aby mohl rovnou volat update_task
+            self.on_notify(entry[4], entry[3])
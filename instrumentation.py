@@ -0,0 +1,255 @@
+"""
+Volitelné měření výkonu obou aplikací.
+
+Zapíná se proměnnou prostředí PYTOOLS_PROFILE=1 nebo parametrem --profile.
+Když je vypnuté, dekorátory vrací původní funkce a nic se neměří.
+
+  PYTOOLS_CPROFILE=save_tasks,refresh_list  - navíc cProfile pro vybrané akce (*.prof soubory)
+  PYTOOLS_PROFILE_FILE=cesta.json           - kam uložit statistiky při ukončení
+  F12 v okně aplikace                       - okno s aktuálními statistikami
+
+Monitor zpoždění Tk smyčky (LagMonitor) běží vždy, vypne se PYTOOLS_LAG_MONITOR=0.
+Při zaseknutí hlavního vlákna zapíše jeho zásobník do <aplikace>_stalls.log.
+"""
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import tkinter as tk
+from tkinter import ttk
+
+ENABLED = os.environ.get("PYTOOLS_PROFILE", "0") not in ("", "0") or "--profile" in sys.argv
+CPROFILE_ACTIONS = {name for name in os.environ.get("PYTOOLS_CPROFILE", "").split(",") if name}
+APP_NAME = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+STATS_FILE = os.environ.get("PYTOOLS_PROFILE_FILE", f"{APP_NAME}_profile.json")
+
+LAG_MONITOR_ENABLED = os.environ.get("PYTOOLS_LAG_MONITOR", "1") != "0"
+STALLS_FILE = f"{APP_NAME}_stalls.log"
+
+_stats = {}  # název -> [počet, celkem s, max s]
+_lock = threading.Lock()
+_profile_counter = {}
+# cProfile smí v procesu běžet jen jeden (od Pythonu 3.12 i napříč vlákny)
+_profiler_lock = threading.Lock()
+
+
+def record(name, seconds):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+
+def snapshot():
+    """Statistiky jako {název: {"count", "total_ms", "avg_ms", "max_ms"}}"""
+    with _lock:
+        return {
+            name: {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(peak * 1000, 3),
+            }
+            for name, (count, total, peak) in _stats.items()
+        }
+
+
+def _run_profiled(name, func, args, kwargs):
+    """
+    Spustí akci pod cProfile a uloží výsledek do <aplikace>_<akce>_<n>.prof.
+    Když už profiler běží (vnořená akce, jiné vlákno, python -m cProfile), akce se
+    jen změří - profilování nikdy nesmí shodit samotné volání.
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return func(*args, **kwargs)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        _profiler_lock.release()
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        _profiler_lock.release()
+        with _lock:
+            n = _profile_counter[name] = _profile_counter.get(name, 0) + 1
+        try:
+            profile.dump_stats(f"{APP_NAME}_{name}_{n}.prof")
+        except OSError:
+            pass
+
+
+def instrumented(name):
+    """Dekorátor měřící dobu a počet volání. Při vypnutém měření vrací funkci beze změny."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                if name in CPROFILE_ACTIONS:
+                    return _run_profiled(name, func, args, kwargs)
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def dump_stats(path=STATS_FILE):
+    stats = snapshot()
+    if _lag_monitor is not None:
+        stats["tk_lag_histogram"] = _lag_monitor.histogram_snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=4, ensure_ascii=False)
+
+
+class LagMonitor:
+    """
+    Měří, o kolik později než naplánováno se spouští pravidelný tick Tk smyčky
+    (histogram zpoždění). Hlídací vlákno při zaseknutí delším než stall_threshold
+    zachytí zásobník hlavního vlákna - tedy právě blokující volání.
+    """
+    TICK_MS = 200
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500) # horní meze přihrádek histogramu
+
+    def __init__(self, root, stall_threshold=0.5, log_path=STALLS_FILE):
+        self.root = root
+        self.stall_threshold = stall_threshold
+        self.log_path = log_path
+        self.main_thread_id = threading.get_ident() # vytváří se v hlavním (Tk) vlákně
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.expected = time.monotonic() + self.TICK_MS / 1000
+        self.stall_reported = False
+
+    def start(self):
+        global _lag_monitor
+        _lag_monitor = self
+        self.expected = time.monotonic() + self.TICK_MS / 1000
+        self.root.after(self.TICK_MS, self._tick)
+        threading.Thread(target=self._watchdog, daemon=True).start()
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self.expected)
+        lag_ms = lag * 1000
+        index = 0
+        while index < len(self.BUCKETS_MS) and lag_ms > self.BUCKETS_MS[index]:
+            index += 1
+        self.histogram[index] += 1
+        self.max_lag = max(self.max_lag, lag)
+        if ENABLED:
+            record("tk_lag", lag)
+        self.stall_reported = False
+        self.expected = now + self.TICK_MS / 1000
+        self.root.after(self.TICK_MS, self._tick)
+
+    def _watchdog(self):
+        while True:
+            time.sleep(self.stall_threshold / 2)
+            overdue = time.monotonic() - self.expected
+            if overdue > self.stall_threshold and not self.stall_reported:
+                self.stall_reported = True
+                frame = sys._current_frames().get(self.main_thread_id)
+                if frame is not None:
+                    self.report_stall(overdue, "".join(traceback.format_stack(frame)))
+
+    def report_stall(self, overdue, stack):
+        message = (f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Tk smyčka stojí už {overdue * 1000:.0f} ms, "
+                   f"hlavní vlákno:\n{stack}\n")
+        print(message, file=sys.stderr)
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(message)
+        except OSError:
+            pass
+
+    def histogram_snapshot(self):
+        """{"<=5ms": počet, ..., ">2500ms": počet, "max_ms": ...}"""
+        labels = [f"<={limit}ms" for limit in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        result = dict(zip(labels, self.histogram))
+        result["max_ms"] = round(self.max_lag * 1000, 1)
+        return result
+
+
+_lag_monitor = None
+
+
+def start_lag_monitor(root):
+    """Spustí LagMonitor pro danou Tk smyčku (pokud není vypnutý)"""
+    if not LAG_MONITOR_ENABLED:
+        return None
+    monitor = LagMonitor(root)
+    monitor.start()
+    return monitor
+
+
+def _instrument_after():
+    """Obalí tk.Misc.after, aby se měřily i callbacky plánované přes after"""
+    original_after = tk.Misc.after
+
+    def after(widget, ms, func=None, *args):
+        if func is None:
+            return original_after(widget, ms)
+        name = "after:" + getattr(func, "__qualname__", type(func).__name__)
+        return original_after(widget, ms, instrumented(name)(func), *args)
+
+    tk.Misc.after = after
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Okno s aktuálními statistikami měření"""
+    COLUMNS = ("count", "total_ms", "avg_ms", "max_ms")
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Diagnostika")
+        self.geometry("560x320")
+
+        btn_frame = ttk.Frame(self, padding=5)
+        btn_frame.pack(side="bottom", fill="x")
+        ttk.Button(btn_frame, text="Obnovit", command=self.refresh).pack(side="left")
+        ttk.Button(btn_frame, text="Uložit JSON", command=lambda: dump_stats()).pack(side="left", padx=5)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS)
+        self.tree.heading("#0", text="Akce")
+        self.tree.column("#0", width=200)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=80, anchor="e")
+        self.tree.pack(expand=True, fill="both")
+        self.refresh()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        stats = snapshot()
+        for name in sorted(stats, key=lambda n: stats[n]["total_ms"], reverse=True):
+            self.tree.insert("", "end", text=name, values=[stats[name][col] for col in self.COLUMNS])
+        if _lag_monitor is not None:
+            lag = self.tree.insert("", "end", text="Zpoždění Tk smyčky", open=True)
+            for label, count in _lag_monitor.histogram_snapshot().items():
+                self.tree.insert(lag, "end", text=label, values=(count, "", "", ""))
+
+
+def install(root):
+    """Zapne měření after callbacků, okno diagnostiky (F12) a uložení statistik při ukončení"""
+    if not ENABLED:
+        return
+    _instrument_after()
+    root.bind_all("<F12>", lambda e: DiagnosticsWindow(root))
+    atexit.register(dump_stats)
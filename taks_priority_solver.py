@@ -3,20 +3,99 @@ from tkinter import ttk, messagebox
 from tkcalendar import Calendar
 import json
 import os
+import sys
+import time
+import select
+import struct
+import threading
+import socket
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import uuid
+import unicodedata
+from collections import deque
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+import instrumentation
+from instrumentation import instrumented
 
 # --- KONFIGURACE A DATA ---
 DATA_FILE = "tasks.json"
+# Historie pro Zpět/Znovu se ukládá vedle úkolů jako deník (JSON Lines), který se jen připisuje
+HISTORY_FILE = "tasks_history.jsonl"
+HISTORY_LIMIT = 50 # Max. počet kroků zpět, nejstarší se zahazují
+HISTORY_MAX_STATES = 5000 # Max. počet stavů úkolů v celé historii, nejstarší kroky se zahazují
+HISTORY_STEP_LIMIT = 1000 # Větší krok (hromadný import) se do historie nezapíše
+HISTORY_COMPACT_LINES = 4 * HISTORY_LIMIT # Delší deník se přepíše jedním snapshotem
+# Socket volitelného daemonu se sdíleným stavem úkolů (task_service.py) - pro každého
+# uživatele zvlášť: $XDG_RUNTIME_DIR (jen pro vlastníka), jinak temp s uid v názvu
+if os.environ.get("XDG_RUNTIME_DIR") and os.path.isdir(os.environ["XDG_RUNTIME_DIR"]):
+    SERVICE_SOCKET = os.path.join(os.environ["XDG_RUNTIME_DIR"], "python-tools-tasks.sock")
+else:
+    _user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    SERVICE_SOCKET = os.path.join(tempfile.gettempdir(), f"python-tools-tasks-{_user}.sock")
 
 # Barvy pro sortování
 COLOR_SORT_ACTIVE = "#f5f5dc"  # Béžová
 COLOR_SORT_INACTIVE = "#f0f0f0" # Světle šedá (defaultní pozadí)
 
+# Podbarvení dnů v kalendáři podle počtu aktivních úkolů s deadlinem (1, 2, 3, 4+)
+DENSITY_COLORS = ["#fff9c4", "#ffe082", "#ffb74d", "#ff8a65"]
+
+# Jak často kontrolovat změnu data (zachytí i probuzení z uspání, kdy Tk timer "stojí")
+DAY_CHECK_INTERVAL_MS = 60 * 1000
+# Hledání se spustí až po pauze v psaní (cca jeden snímek - sloučí jen rychlé úhozy)
+SEARCH_DEBOUNCE_MS = 16
+# Max. vykreslených řádků v jedné sekci výsledků hledání (zbytek jen jako "… a dalších N")
+MAX_SECTION_ROWS = 200
+# Kolik času (s) smí stavba vyhledávacího indexu zabrat v jednom průchodu Tk smyčky
+SEARCH_INDEX_SLICE = 0.008
+
 class TaskManager:
     """Třída pro správu dat (načítání/ukládání JSON) a logiku priorit"""
+    watch_disk = True # Hlídat externí změny tasks.json (vzdálený stav hlídá daemon)
+    keep_history = True # Vést historii Zpět/Znovu a ukládat ji do HISTORY_FILE
+
     def __init__(self):
+        self.disk_signature = None
         self.tasks = self.load_tasks()
+
+        # Dávkové ukládání - uvnitř batch() se save_tasks jen poznamená
+        self.batch_depth = 0
+        self.dirty = False
+        # Úkoly změněné / smazané od posledního uložení
+        self.changed_ids = set()
+        self.removed_ids = set()
+
+        # Deadline buckety: datum -> {id: úkol}. Při přechodu dne se přepočítají jen
+        # úkoly z dnů, přes které se přešlo, ne celý seznam.
+        self.deadline_buckets = {}  # aktivní úkoly podle deadlinu
+        self.watchlist_buckets = {} # úkoly ve watchlistu podle data přesunu
+        self.bucket_keys = {}       # id -> (buckety, datum)
+        self.task_index = {}        # id -> úkol
+        self.subtask_counts = {}    # id -> (hotové, celkem) podúkoly
+        self._search_index = None   # trigramový index, staví se po kouscích (build_search_index)
+        self._search_backlog = []   # úkoly, které do indexu ještě nebyly přidány
+        for task in self.tasks:
+            self._index_task(task)
+        self.changed_ids.clear()
+        self.current_day = datetime.now().date()
+
+        # Zpět/Znovu: každý krok je seznam [id, stav_před, stav_po] jen pro změněné úkoly
+        # (stavy jako JSON, None = úkol neexistuje). Naposledy uložený stav úkolů
+        # drží committed, takže záznam kroku stojí O(změněných úkolů).
+        self.committed = {task["id"]: self.serialize_task(task) for task in self.tasks}
+        self.undo_stack = deque(maxlen=HISTORY_LIMIT)
+        self.redo_stack = deque(maxlen=HISTORY_LIMIT)
+        self.history_log = []   # operace čekající na připsání do deníku
+        self.history_lines = 0  # počet řádků deníku na disku
+        self.history_lock = None # zámek vlastníka deníku (viz load_history)
+        self.load_history()
+
         self.check_watchlist_timeout()
         self.cleanup_old_completed_tasks()
         self.check_startup_priorities()
@@ -25,14 +104,369 @@ class TaskManager:
         if not os.path.exists(DATA_FILE):
             return []
         try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return self.read_tasks_file()
         except (json.JSONDecodeError, FileNotFoundError):
             return []
 
+    def read_tasks_file(self):
+        """Přečte tasks.json a zapamatuje si jeho podpis (mtime, velikost)"""
+        signature = file_signature(DATA_FILE)
+        with open(DATA_FILE, "r", encoding="utf-8") as f:
+            tasks = json.load(f)
+        self.disk_signature = signature
+        return tasks
+
+    @instrumented("save_tasks")
     def save_tasks(self):
+        self.dirty = True
+        if not self.batch_depth:
+            self.flush()
+
+    def flush(self):
+        """Zapíše čekající změny (i uprostřed batch())"""
+        if self.dirty:
+            self.record_history()
+            self.write_tasks()
+            self.dirty = False
+            self.changed_ids.clear()
+            self.removed_ids.clear()
+
+    @contextmanager
+    def batch(self):
+        """Sloučí všechna uložení uvnitř bloku do jednoho zápisu"""
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if not self.batch_depth:
+                self.flush()
+
+    @instrumented("write_tasks")
+    def write_tasks(self):
         with open(DATA_FILE, "w", encoding="utf-8") as f:
             json.dump(self.tasks, f, indent=4, ensure_ascii=False)
+        # Vlastní zápis si zapamatujeme, aby ho watcher nebral jako externí změnu
+        self.disk_signature = file_signature(DATA_FILE)
+        self.save_history()
+
+    # --- ZPĚT / ZNOVU ---
+
+    @staticmethod
+    def serialize_task(task):
+        return json.dumps(task, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+    def load_history(self):
+        """
+        Přehraje deník historie - snapshot a po něm operace push/undo/redo/clear.
+        Deník vede vždy jen jeden proces (drží zámek HISTORY_FILE.lock). Další instance,
+        CLI nebo klienti daemonu mají historii jen v paměti, aby se jejich kroky nemíchaly.
+        """
+        if not self.keep_history:
+            return
+        self.history_lock = try_lock_file(HISTORY_FILE + ".lock")
+        if self.history_lock is None or not os.path.exists(HISTORY_FILE):
+            return
+        try:
+            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.history_lines += 1
+                    try:
+                        self._replay_history(json.loads(line))
+                    except (json.JSONDecodeError, AttributeError, KeyError, TypeError):
+                        # Nedopsaný řádek (pád při zápisu) - příští uložení deník přepíše
+                        self.history_lines = HISTORY_COMPACT_LINES
+        except OSError:
+            pass
+
+    def _replay_history(self, entry):
+        op = entry.get("op")
+        if op == "push":
+            self._push_step(entry["step"])
+        elif op == "undo" and self.undo_stack:
+            self.redo_stack.append(self.undo_stack.pop())
+        elif op == "redo" and self.redo_stack:
+            self.undo_stack.append(self.redo_stack.pop())
+        elif op == "clear":
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+        elif op == "snapshot":
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.undo_stack.extend(entry.get("undo", []))
+            self.redo_stack.extend(entry.get("redo", []))
+
+    def save_history(self):
+        """Připíše nové operace do deníku, příliš dlouhý deník nahradí jedním snapshotem"""
+        if self.history_lock is None:
+            self.history_log.clear() # deník vede jiný proces, historie zůstává jen v paměti
+            return
+        if not self.history_log:
+            return
+        if self.history_lines + len(self.history_log) > HISTORY_COMPACT_LINES:
+            entries = [{"op": "snapshot", "undo": list(self.undo_stack), "redo": list(self.redo_stack)}]
+            tmp_path = HISTORY_FILE + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(self._history_line(entry) for entry in entries)
+            os.replace(tmp_path, HISTORY_FILE)
+            self.history_lines = 1
+        else:
+            with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+                f.writelines(self._history_line(entry) for entry in self.history_log)
+            self.history_lines += len(self.history_log)
+        self.history_log.clear()
+
+    @staticmethod
+    def _history_line(entry):
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _push_step(self, step):
+        """Nový krok zpět - zahodí Znovu a nejstarší kroky nad HISTORY_MAX_STATES stavů"""
+        self.undo_stack.append(step)
+        self.redo_stack.clear()
+        states = sum(len(old_step) for old_step in self.undo_stack)
+        while states > HISTORY_MAX_STATES and len(self.undo_stack) > 1:
+            states -= len(self.undo_stack.popleft())
+
+    def record_history(self):
+        """Z úkolů změněných od posledního uložení udělá jeden krok historie"""
+        if not self.keep_history:
+            return
+        step = []
+        for task_id in self.changed_ids | self.removed_ids:
+            task = self.task_index.get(task_id)
+            after = self.serialize_task(task) if task is not None else None
+            before = self.committed.get(task_id)
+            if before == after:
+                continue
+            step.append([task_id, before, after])
+            self._commit_state(task_id, after)
+        if len(step) > HISTORY_STEP_LIMIT:
+            # Hromadná změna (import) - starší kroky by přes ni už nešly rozumně vrátit
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.history_log.append({"op": "clear"})
+        elif step:
+            self._push_step(step)
+            self.history_log.append({"op": "push", "step": step})
+
+    def _commit_state(self, task_id, state):
+        if state is None:
+            self.committed.pop(task_id, None)
+        else:
+            self.committed[task_id] = state
+
+    def undo(self):
+        """Vrátí poslední krok. Vrací (changed_ids, removed_ids), nebo None když není co vracet."""
+        if not self.undo_stack:
+            return None
+        step = self.undo_stack.pop()
+        self.redo_stack.append(step)
+        self.history_log.append({"op": "undo"})
+        return self._apply_step(step, undo=True)
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        step = self.redo_stack.pop()
+        self.undo_stack.append(step)
+        self.history_log.append({"op": "redo"})
+        return self._apply_step(step, undo=False)
+
+    def _apply_step(self, step, undo):
+        changed, removed = set(), set()
+        for task_id, before, after in step:
+            target, expected = (before, after) if undo else (after, before)
+            current = self.task_index.get(task_id)
+            current_state = self.serialize_task(current) if current is not None else None
+            if current_state != expected:
+                # Úkol se mezitím změnil jinak (jiná instance, synchronizace) - nepřepisujeme
+                continue
+            if target is None:
+                removed.add(task_id)
+            else:
+                data = json.loads(target)
+                if current is None:
+                    self.tasks.append(data)
+                    self._index_task(data)
+                else:
+                    current.clear()
+                    current.update(data)
+                    self._index_task(current)
+                changed.add(task_id)
+            # Stav už je "uložený", record_history z něj nový krok neudělá
+            self._commit_state(task_id, target)
+        if removed:
+            self.tasks = [t for t in self.tasks if t["id"] not in removed]
+            for task_id in removed:
+                self._unindex_task(task_id)
+        self.save_tasks()
+        return changed, removed
+
+    def reload_from_disk(self):
+        """
+        Znovu načte tasks.json po externí změně a aplikuje jen změněné úkoly (podle id).
+        Čekající neuložené změny (uvnitř batch()) se zachovají - nový úkol, který ještě
+        není na disku, se neodebere a smazaný se znovu nepřidá. Při konfliktu vyhrává disk.
+        Vrací (changed_ids, removed_ids).
+        """
+        if file_signature(DATA_FILE) == self.disk_signature:
+            return set(), set()
+        try:
+            new_tasks = self.read_tasks_file()
+        except (json.JSONDecodeError, FileNotFoundError):
+            # Soubor je zrovna rozepsaný jiným procesem - počkáme na další událost
+            return set(), set()
+
+        changed = self.merge_tasks([t for t in new_tasks if t.get("id") not in self.removed_ids])
+        seen = {t["id"] for t in new_tasks if "id" in t}
+        removed = self.drop_tasks(set(self.task_index) - seen - self.changed_ids)
+        return changed, removed
+
+    def merge_tasks(self, new_tasks, pending=False):
+        """
+        Aplikuje externí verze úkolů (soubor, daemon) - nové přidá, změněné aktualizuje.
+        Nepočítají se jako vlastní změny k uložení, s pending=True ano (daemon je teprve
+        zapíše, reload_from_disk je mezitím nesmí přepsat). Vrací množinu id změněných úkolů.
+        """
+        changed = set()
+        for new_task in new_tasks:
+            task_id = new_task.get("id")
+            if task_id is None:
+                continue
+            old_task = self.task_index.get(task_id)
+            if old_task is None:
+                self.tasks.append(new_task)
+                self._index_task(new_task)
+            elif old_task != new_task:
+                # Aktualizace na místě - otevřená okna drží referenci na stejný dict
+                old_task.clear()
+                old_task.update(new_task)
+                self._index_task(old_task)
+            else:
+                continue
+            changed.add(task_id)
+            if not pending:
+                self.changed_ids.discard(task_id)
+            self._commit_state(task_id, self.serialize_task(self.task_index[task_id]))
+        return changed
+
+    def drop_tasks(self, task_ids, pending=False):
+        """Odebere úkoly smazané externě (pending viz merge_tasks). Vrací množinu id skutečně odebraných úkolů."""
+        removed = {task_id for task_id in task_ids if task_id in self.task_index}
+        if removed:
+            self.tasks = [t for t in self.tasks if t["id"] not in removed]
+            for task_id in removed:
+                self._unindex_task(task_id)
+                if not pending:
+                    self.removed_ids.discard(task_id)
+                self._commit_state(task_id, None)
+        return removed
+
+    # --- INDEXY ---
+
+    def _index_task(self, task):
+        """Zařadí (nebo přeřadí) změněný úkol do indexů a deadline/watchlist bucketu podle jeho stavu"""
+        self._drop_from_indexes(task["id"])
+        self.task_index[task["id"]] = task
+        subtasks = task.get("subtasks", [])
+        self.subtask_counts[task["id"]] = (sum(1 for sub in subtasks if sub.get("done")), len(subtasks))
+        if self._search_index is not None:
+            self._search_index.add(task)
+        self.changed_ids.add(task["id"])
+        self.removed_ids.discard(task["id"])
+        if task.get("completed_date"):
+            return
+        if task.get("watchlist_date"):
+            buckets, date_str = self.watchlist_buckets, task["watchlist_date"]
+        else:
+            buckets, date_str = self.deadline_buckets, task.get("deadline", "")
+        try:
+            day = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            return
+        buckets.setdefault(day, {})[task["id"]] = task
+        self.bucket_keys[task["id"]] = (buckets, day)
+
+    def _unindex_task(self, task_id):
+        """Odebere smazaný úkol ze všech indexů"""
+        self._drop_from_indexes(task_id)
+        if self._search_index is not None:
+            self._search_index.remove(task_id)
+        self.changed_ids.discard(task_id)
+        self.removed_ids.add(task_id)
+
+    def _drop_from_indexes(self, task_id):
+        self.task_index.pop(task_id, None)
+        self.subtask_counts.pop(task_id, None)
+        key = self.bucket_keys.pop(task_id, None)
+        if key is None:
+            return
+        buckets, day = key
+        bucket = buckets.get(day)
+        if bucket is not None:
+            bucket.pop(task_id, None)
+            if not bucket:
+                del buckets[day]
+
+    def build_search_index(self, budget=None):
+        """
+        Postaví trigramový index - celý, nebo jen na budget sekund (GUI ho tak staví
+        po kouscích v nečinnosti Tk smyčky). Hotový index se udržuje inkrementálně.
+        Vrací True, když je index kompletní.
+        """
+        if self._search_index is None:
+            self._search_index = TaskSearchIndex()
+            self._search_backlog = list(self.tasks)
+        backlog = self._search_backlog
+        deadline = None if budget is None else time.perf_counter() + budget
+        while backlog:
+            task = backlog.pop()
+            # Mezitím smazaný úkol přeskočíme, změněný už index má z _index_task
+            if self.task_index.get(task["id"]) is task:
+                self._search_index.add(task)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return not backlog
+
+    @property
+    def search_index(self):
+        """Kompletní trigramový index (zbytek dostaví najednou - CLI, daemon)"""
+        self.build_search_index()
+        return self._search_index
+
+    def search(self, query):
+        """Hledání bez čekání na stavbu indexu - do jejího konce jen v už zaindexovaných úkolech"""
+        if self._search_index is None:
+            self.build_search_index(budget=0)
+        return self._search_index.search(query)
+
+    def get_task(self, task_id):
+        return self.task_index.get(task_id)
+
+    def subtask_progress(self, task_id):
+        """(hotové, celkem) podúkoly - počítá se při změně úkolu, ne při každém dotazu"""
+        return self.subtask_counts.get(task_id, (0, 0))
+
+    def all_subtasks_done(self, task_id):
+        done, total = self.subtask_progress(task_id)
+        return done == total
+
+    def bucket_tasks(self, buckets, first_day, last_day):
+        """Úkoly z bucketů pro dny first_day..last_day (včetně)"""
+        tasks = []
+        day = first_day
+        while day <= last_day:
+            tasks.extend(buckets.get(day, {}).values())
+            day += timedelta(days=1)
+        return tasks
+
+    def insert_task(self, task):
+        """Přidá hotový úkol (např. z importu)"""
+        self.tasks.append(task)
+        self._index_task(task)
+        self.save_tasks()
+        return task
 
     def add_task(self, title, deadline, priority, description=""):
         new_task = {
@@ -45,51 +479,54 @@ class TaskManager:
             "completed_date": None,
             "watchlist_date": None 
         }
-        self.tasks.append(new_task)
-        self.save_tasks()
+        return self.insert_task(new_task)
 
     def update_task(self, task_data):
-        for i, task in enumerate(self.tasks):
-            if task["id"] == task_data["id"]:
-                self.tasks[i] = task_data
-                break
+        task = self.task_index.get(task_data["id"])
+        if task is not None:
+            if task is not task_data:
+                # Aktualizace na místě - pořadí v seznamu i reference zůstanou
+                task.clear()
+                task.update(task_data)
+            self._index_task(task)
         self.save_tasks()
 
     def delete_task(self, task_id):
         self.tasks = [t for t in self.tasks if t["id"] != task_id]
+        self._unindex_task(task_id)
         self.recalc_priorities_after_change()
         self.save_tasks()
 
     # --- WATCHLIST A STATUS LOGIKA ---
 
     def move_to_watchlist(self, task_id):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["watchlist_date"] = datetime.now().strftime("%Y-%m-%d")
-                task["completed_date"] = None
-                break
+        task = self.task_index.get(task_id)
+        if task is not None:
+            task["watchlist_date"] = datetime.now().strftime("%Y-%m-%d")
+            task["completed_date"] = None
+            self._index_task(task)
         self.save_tasks()
 
     def confirm_watchlist_completion(self, task_id):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                final_date = task.get("watchlist_date") or datetime.now().strftime("%Y-%m-%d")
-                task["completed_date"] = final_date
-                break
+        task = self.task_index.get(task_id)
+        if task is not None:
+            final_date = task.get("watchlist_date") or datetime.now().strftime("%Y-%m-%d")
+            task["completed_date"] = final_date
+            self._index_task(task)
         self.recalc_priorities_after_change()
         self.save_tasks()
 
     def return_from_watchlist_bug(self, task_id):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["watchlist_date"] = None
-                task["completed_date"] = None
-                task["priority"] = 15
-                task["deadline"] = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-                if "subtasks" not in task:
-                    task["subtasks"] = []
-                task["subtasks"].append({"text": "Opravit bugy (vráceno z Watchlistu)", "done": False})
-                break
+        task = self.task_index.get(task_id)
+        if task is not None:
+            task["watchlist_date"] = None
+            task["completed_date"] = None
+            task["priority"] = 15
+            task["deadline"] = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+            if "subtasks" not in task:
+                task["subtasks"] = []
+            task["subtasks"].append({"text": "Opravit bugy (vráceno z Watchlistu)", "done": False})
+            self._index_task(task)
         self.save_tasks()
 
     def check_watchlist_timeout(self):
@@ -101,6 +538,7 @@ class TaskManager:
                     w_date = datetime.strptime(task["watchlist_date"], "%Y-%m-%d").date()
                     if (today - w_date).days >= 14:
                         task["completed_date"] = task["watchlist_date"]
+                        self._index_task(task)
                         changed = True
                 except ValueError:
                     pass
@@ -109,11 +547,11 @@ class TaskManager:
             self.save_tasks()
 
     def mark_as_completed_directly(self, task_id):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["completed_date"] = datetime.now().strftime("%Y-%m-%d")
-                task["watchlist_date"] = None
-                break
+        task = self.task_index.get(task_id)
+        if task is not None:
+            task["completed_date"] = datetime.now().strftime("%Y-%m-%d")
+            task["watchlist_date"] = None
+            self._index_task(task)
         self.recalc_priorities_after_change()
         self.save_tasks()
 
@@ -129,6 +567,7 @@ class TaskManager:
                     if (today - comp_date).days <= 31:
                         tasks_to_keep.append(task)
                     else:
+                        self._unindex_task(task["id"])
                         modified = True
                 except ValueError:
                     tasks_to_keep.append(task)
@@ -145,21 +584,101 @@ class TaskManager:
             if task.get("completed_date") or task.get("watchlist_date"):
                 continue
             
-            days = days_remaining(task['deadline'])
-            
-            if days < 0:
-                if task['priority'] != 15:
-                    task['priority'] = 15
-                    changed = True
-            elif days < 2:
-                if task['priority'] < 13:
-                    task['priority'] = 13
-                    changed = True
+            if self.escalate_priority(task):
+                changed = True
         
         if changed:
             self.save_tasks()
 
-    def recalc_priorities_after_change(self):
+    def escalate_priority(self, task):
+        """Pravidla eskalace podle deadlinu (po termínu 15, méně než 2 dny alespoň 13). Vrací True při změně."""
+        days = days_remaining(task['deadline'])
+        if days < 0:
+            if task['priority'] != 15:
+                task['priority'] = 15
+                self._index_task(task)
+                return True
+        elif days < 2:
+            if task['priority'] < 13:
+                task['priority'] = 13
+                self._index_task(task)
+                return True
+        return False
+
+    def roll_over_day(self, today=None):
+        """
+        Přechod na nový den (půlnoc, probuzení z uspání) pro dlouho běžící aplikaci.
+        Přepočítá jen úkoly z bucketů, jejichž prahy se mezi minulým a dnešním dnem
+        překročily. Vrací množinu id změněných úkolů.
+        """
+        today = today or datetime.now().date()
+        last_day = self.current_day
+        if today <= last_day:
+            return set()
+        self.current_day = today
+        changed = set()
+
+        # Watchlist timeout (14 dní): nově vypršely přesuny z (last_day - 14, today - 14]
+        expired = self.bucket_tasks(self.watchlist_buckets,
+                                    last_day - timedelta(days=13), today - timedelta(days=14))
+        for task in expired:
+            task["completed_date"] = task["watchlist_date"]
+            self._index_task(task)
+            changed.add(task["id"])
+        if expired:
+            # Stejně jako při startu - dokončení posune priority ostatních úkolů
+            before = {t["id"]: t["priority"] for t in self.deadline_tasks()}
+            self.recalc_priorities_after_change()
+            changed.update(t["id"] for t in self.deadline_tasks() if before.get(t["id"]) != t["priority"])
+
+        # Po termínu: deadline v [last_day, today), méně než 2 dny: v [last_day + 2, today + 2)
+        candidates = self.bucket_tasks(self.deadline_buckets, last_day, today - timedelta(days=1))
+        candidates += self.bucket_tasks(self.deadline_buckets,
+                                        last_day + timedelta(days=2), today + timedelta(days=1))
+        for task in candidates:
+            if self.escalate_priority(task):
+                changed.add(task["id"])
+
+        if changed:
+            self.save_tasks()
+        return changed
+
+    def deadline_histogram(self, first_day, last_day):
+        """Počet aktivních úkolů s deadlinem v jednotlivých dnech (jen dny s úkoly) - z bucketů"""
+        histogram = {}
+        day = first_day
+        while day <= last_day:
+            bucket = self.deadline_buckets.get(day)
+            if bucket:
+                histogram[day] = len(bucket)
+            day += timedelta(days=1)
+        return histogram
+
+    def deadline_tasks(self):
+        """Aktivní úkoly (z deadline bucketů)"""
+        return [task for bucket in self.deadline_buckets.values() for task in bucket.values()]
+
+    def mark_many_completed(self, task_ids):
+        """
+        Hromadné splnění - priority ostatních se posunou jednou za všechny úkoly.
+        Úkol z watchlistu se uzavře k datu přesunu jako v confirm_watchlist_completion,
+        aktivní úkol dnešním datem jako v mark_as_completed_directly.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        count = 0
+        for task_id in task_ids:
+            task = self.task_index.get(task_id)
+            if task is not None and not task.get("completed_date"):
+                task["completed_date"] = task.get("watchlist_date") or today
+                self._index_task(task)
+                count += 1
+        if count:
+            self.recalc_priorities_after_change(times=count)
+            self.save_tasks()
+        return count
+
+    def recalc_priorities_after_change(self, times=1):
+        """Každá dokončená/smazaná položka zvedne úkolům s deadlinem do 10 dní prioritu o 2 (max 15)"""
         changed = False
         for task in self.tasks:
             if task.get("completed_date") or task.get("watchlist_date"):
@@ -170,9 +689,10 @@ class TaskManager:
             if days < 10:
                 old_prio = task['priority']
                 if old_prio < 15:
-                    new_prio = min(15, old_prio + 2)
+                    new_prio = min(15, old_prio + 2 * times)
                     if new_prio != old_prio:
                         task['priority'] = new_prio
+                        self._index_task(task)
                         changed = True
 
 # --- POMOCNÉ FUNKCE ---
@@ -188,6 +708,34 @@ def get_priority_color(priority):
         b = 0
     return f'#{r:02x}{g:02x}{b:02x}'
 
+def try_lock_file(path):
+    """
+    Zamkne soubor pro tento proces bez čekání. Vrací otevřený soubor (zámek platí, dokud
+    je otevřený, pád procesu ho uvolní), nebo None, když zámek drží jiný proces.
+    """
+    try:
+        f = open(path, "a+")
+    except OSError:
+        return None
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def file_signature(path):
+    """Vrátí (mtime_ns, velikost) souboru, nebo None pokud neexistuje"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
 def days_remaining(deadline_str):
     try:
         deadline = datetime.strptime(deadline_str, "%Y-%m-%d").date()
@@ -197,8 +745,370 @@ def days_remaining(deadline_str):
     except ValueError:
         return 0
 
+# --- VYHLEDÁVÁNÍ ---
+def normalize_search_text(text):
+    """Malá písmena bez diakritiky - 'úkol' najde i 'ukol'"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+class TaskSearchIndex:
+    """
+    Inkrementální trigramový index nad názvem, popisem a texty podúkolů.
+    TaskManager ho aktualizuje při každé změně úkolu, dotaz pak prochází jen
+    kandidáty z průniku posting listů místo všech úkolů.
+    """
+    N = 3
+
+    def __init__(self):
+        self.postings = {} # trigram -> množina id
+        self.texts = {}    # id -> normalizovaný text úkolu
+        # Poslední dotaz a výsledek (platí, dokud se index nezmění)
+        self.last_words = []
+        self.last_result = None
+
+    @staticmethod
+    def task_text(task):
+        parts = [task.get("title", ""), task.get("description", "")]
+        parts.extend(sub.get("text", "") for sub in task.get("subtasks", []))
+        return normalize_search_text("\n".join(parts))
+
+    def grams(self, text):
+        return {text[i:i + self.N] for i in range(len(text) - self.N + 1)}
+
+    def add(self, task):
+        text = self.task_text(task)
+        if self.texts.get(task["id"]) == text:
+            return
+        self.remove(task["id"])
+        self.last_result = None
+        self.texts[task["id"]] = text
+        for gram in self.grams(text):
+            self.postings.setdefault(gram, set()).add(task["id"])
+
+    def remove(self, task_id):
+        text = self.texts.pop(task_id, None)
+        if text is None:
+            return
+        self.last_result = None
+        for gram in self.grams(text):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, query):
+        """Vrátí množinu id úkolů obsahujících všechna slova dotazu (prázdný dotaz = None)"""
+        words = normalize_search_text(query).split()
+        if not words:
+            return None
+
+        # Psaní dotaz jen zpřesňuje - stačí hledat ve výsledku předchozího dotazu
+        result = None
+        if self.last_result is not None and all(any(old in new for new in words) for old in self.last_words):
+            result = self.last_result
+            # Slova beze změny už výsledek předchozího dotazu splňuje
+            words_to_check = [word for word in words if word not in self.last_words]
+        else:
+            words_to_check = words
+
+        # Nejdřív slova s nejmenším posting listem, krátká slova (bez trigramu) nakonec
+        plan = []
+        for word in words_to_check:
+            if len(word) < self.N:
+                plan.append((float("inf"), word, None))
+            else:
+                posting_sets = sorted((self.postings.get(gram, set()) for gram in self.grams(word)), key=len)
+                plan.append((len(posting_sets[0]), word, posting_sets))
+        plan.sort(key=lambda item: item[0])
+
+        for _, word, posting_sets in plan:
+            if posting_sets is None:
+                pool = result if result is not None else self.texts.keys()
+                result = {task_id for task_id in pool if word in self.texts[task_id]}
+            else:
+                if result is not None:
+                    posting_sets = sorted(posting_sets + [result], key=len)
+                candidates = posting_sets[0].intersection(*posting_sets[1:])
+                # Trigramy nehlídají pořadí - kandidáty ověříme
+                result = {task_id for task_id in candidates if word in self.texts[task_id]}
+            if not result:
+                break
+
+        self.last_words, self.last_result = words, result
+        return result
+
+# --- HLÍDÁNÍ SOUBORU ---
+class TaskFileWatcher:
+    """
+    Hlídá změny souboru na disku (jiná instance, synchronizace, skript).
+    Na Linuxu používá inotify, jinde polling mtime. Dávky událostí se debouncují
+    a callback se zavolá jednou - POZOR, z vlákna watcheru (do Tk přes after).
+    """
+    DEBOUNCE = 0.3      # s ticha, než změnu ohlásíme
+    POLL_INTERVAL = 1.0 # s mezi kontrolami mtime (fallback)
+
+    # Konstanty z <sys/inotify.h>
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, path, callback):
+        self.path = os.path.abspath(path)
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        inotify_fd = self._init_inotify()
+        if inotify_fd is not None:
+            target, args = self._run_inotify, (inotify_fd,)
+        else:
+            target, args = self._run_polling, ()
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _init_inotify(self):
+        """Vrátí inotify deskriptor sledující adresář souboru, nebo None (není Linux / chyba)"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            # Sledujeme adresář - synchronizační nástroje soubor často nahrazují přes rename
+            mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+            wd = libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask)
+            if wd < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _run_inotify(self, fd):
+        name = os.path.basename(self.path).encode()
+        pending_since = None
+        try:
+            while not self._stop.is_set():
+                timeout = 0.5 if pending_since is None else self.DEBOUNCE
+                ready, _, _ = select.select([fd], [], [], timeout)
+                if ready:
+                    data = os.read(fd, 4096)
+                    offset = 0
+                    while offset < len(data):
+                        _, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                        offset += self.EVENT_HEADER.size
+                        event_name = data[offset:offset + length].rstrip(b"\0")
+                        offset += length
+                        if event_name == name:
+                            pending_since = time.monotonic()
+                elif pending_since is not None and time.monotonic() - pending_since >= self.DEBOUNCE:
+                    pending_since = None
+                    self.callback()
+        finally:
+            os.close(fd)
+
+    def _run_polling(self):
+        last_signature = file_signature(self.path)
+        while not self._stop.wait(self.POLL_INTERVAL):
+            signature = file_signature(self.path)
+            if signature == last_signature:
+                continue
+            # Počkáme, až se soubor přestane měnit
+            while not self._stop.wait(self.DEBOUNCE):
+                settled = file_signature(self.path)
+                if settled == signature:
+                    break
+                signature = settled
+            last_signature = signature
+            self.callback()
+
+# --- SDÍLENÝ STAV (task_service daemon) ---
+def encode_message(message):
+    """Zpráva protokolu daemonu = jeden kompaktní JSON řádek"""
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+class TaskServiceClient:
+    """
+    Spojení s daemonem task_service přes Unix domain socket.
+    Po subscribe() daemon posílá změny ({"op": "changed"}), které listen() předává
+    callbacku on_change(tasks, removed_ids) - POZOR, z vlákna čtečky.
+    """
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("r", encoding="utf-8")
+        self.connected = True
+
+    @classmethod
+    def connect(cls, path=SERVICE_SOCKET, timeout=0.5):
+        """Připojí se k běžícímu daemonu, nebo vrátí None (daemon neběží / není AF_UNIX)"""
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            return None
+        sock.settimeout(None)
+        return cls(sock)
+
+    def send(self, message):
+        self.sock.sendall(encode_message(message))
+
+    def subscribe(self):
+        """Přihlásí se k odběru změn a vrátí aktuální seznam úkolů z paměti daemonu"""
+        self.send({"op": "subscribe"})
+        return json.loads(self.reader.readline())["tasks"]
+
+    def listen(self, on_change, on_disconnect=None):
+        def read_loop():
+            try:
+                for line in self.reader:
+                    message = json.loads(line)
+                    if message.get("op") == "changed":
+                        on_change(message.get("tasks", []), message.get("removed", []))
+            except (OSError, ValueError):
+                pass
+            self.connected = False
+            if on_disconnect:
+                on_disconnect()
+        threading.Thread(target=read_loop, daemon=True).start()
+
+class RemoteTaskManager(TaskManager):
+    """
+    TaskManager, jehož stav drží daemon. Místo čtení tasks.json se přihlásí k odběru
+    a při uložení posílá jen změněné úkoly - zápis na disk dávkuje daemon.
+    Historii Zpět/Znovu si ukládá klient sám. Když daemon skončí, ukládá se zase
+    přímo do souboru.
+    """
+    watch_disk = False
+
+    def __init__(self, client):
+        self.client = client
+        self.snapshot = client.subscribe()
+        super().__init__()
+
+    def load_tasks(self):
+        tasks, self.snapshot = self.snapshot, None
+        return tasks
+
+    def write_tasks(self):
+        if not self.client.connected:
+            super().write_tasks()
+            return
+        changed = [self.task_index[task_id] for task_id in self.changed_ids if task_id in self.task_index]
+        if changed or self.removed_ids:
+            try:
+                self.client.send({"op": "put", "tasks": changed, "removed": sorted(self.removed_ids)})
+            except OSError:
+                self.client.connected = False
+                super().write_tasks()
+                return
+        self.save_history()
+
+def open_task_manager():
+    """Vrátí RemoteTaskManager, pokud běží daemon, jinak běžný TaskManager nad tasks.json"""
+    client = TaskServiceClient.connect()
+    if client is not None:
+        try:
+            return RemoteTaskManager(client)
+        except (OSError, ValueError, KeyError):
+            pass
+    return TaskManager()
+
+# --- GUI: KALENDÁŘ ---
+class CalendarPopup(tk.Toplevel):
+    """
+    Znovupoužitelné okno pro výběr data. Calendar (včetně babel/locale) se vytvoří jen jednou,
+    po výběru se okno skryje. Dny jsou podbarvené podle počtu aktivních úkolů s deadlinem.
+    """
+    def __init__(self, master, manager):
+        super().__init__(master)
+        self.title("Vyber datum")
+        self.geometry("300x280")
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+        self.manager = manager
+        self.on_select = None
+        self.marked = {} # datum -> (id události v kalendáři, počet)
+
+        self.cal = Calendar(self, selectmode='day', date_pattern='yyyy-mm-dd')
+        self.cal.pack(pady=(20, 5), padx=20, fill="both", expand=True)
+        for level, color in enumerate(DENSITY_COLORS, start=1):
+            self.cal.tag_config(f"density{level}", background=color, foreground="black")
+        tk.Label(self, text="Podbarvené dny = počet úkolů s deadlinem", fg="grey").pack(pady=(0, 5))
+
+        self.cal.bind("<<CalendarSelected>>", self.on_date_selected)
+        self.cal.bind("<<CalendarMonthChanged>>", lambda e: self.update_overlay())
+
+    def open(self, current_date, on_select, parent_window):
+        self.on_select = on_select
+        self.cal.selection_set(current_date)
+        self.cal.see(current_date)
+        self.update_overlay()
+        self.transient(parent_window)
+        self.deiconify()
+        self.lift()
+        self.focus_set()
+
+    def update_overlay(self):
+        """Obnoví podbarvení zobrazeného měsíce z histogramu deadlinů - mění jen dny, kde se počet liší"""
+        month, year = self.cal.get_displayed_month()
+        first_day = datetime(year, month, 1).date() - timedelta(days=7)
+        histogram = self.manager.deadline_histogram(first_day, first_day + timedelta(days=49))
+
+        for day, (event_id, count) in list(self.marked.items()):
+            if histogram.get(day) != count:
+                self.cal.calevent_remove(event_id)
+                del self.marked[day]
+        for day, count in histogram.items():
+            if day not in self.marked:
+                level = min(count, len(DENSITY_COLORS))
+                event_id = self.cal.calevent_create(day, f"Deadline: {count} úkolů", tags=[f"density{level}"])
+                self.marked[day] = (event_id, count)
+
+    def on_date_selected(self, event=None):
+        if self.on_select:
+            self.on_select(self.cal.get_date())
+        self.withdraw()
+
 # --- GUI: DETAIL OKNO ---
+class SubtaskRow:
+    """Řádek podúkolu (checkbox + mazací tlačítko), který se při mazání nezničí, ale vrací do poolu"""
+    def __init__(self, parent, on_remove):
+        self.var = tk.BooleanVar()
+        self.frame = tk.Frame(parent)
+        self.checkbox = tk.Checkbutton(self.frame, variable=self.var)
+        self.checkbox.pack(side=tk.LEFT)
+        self.remove_btn = tk.Button(self.frame, text="x", font=("Arial", 8), fg="red", relief="flat",
+                                    command=lambda: on_remove(self))
+
+    def bind(self, sub, read_only):
+        self.var.set(sub["done"])
+        self.checkbox.config(text=sub["text"], state="disabled" if read_only else "normal")
+        if read_only:
+            self.remove_btn.pack_forget()
+        else:
+            self.remove_btn.pack(side=tk.RIGHT)
+        self.frame.pack(fill="x", anchor="w")
+
+    def hide(self):
+        self.frame.pack_forget()
+
 class TaskDetailWindow(tk.Toplevel):
+    calendar_popup = None # sdílený CalendarPopup, vytvoří se při prvním použití
+
     def __init__(self, parent, task_data, manager, refresh_callback):
         super().__init__(parent)
         self.title(f"Detail: {task_data['title']}")
@@ -236,9 +1146,27 @@ class TaskDetailWindow(tk.Toplevel):
 
         tk.Label(self, text="Podúkoly:").pack(pady=10)
         
-        self.subtasks_frame = tk.Frame(self)
-        self.subtasks_frame.pack(fill="both", expand=True, padx=20)
-        self.subtask_vars = []
+        # Scrollovatelný seznam podúkolů - řádky se nepřestavují, jen přidávají/skrývají
+        list_frame = tk.Frame(self)
+        list_frame.pack(fill="both", expand=True, padx=20)
+        self.subtasks_canvas = tk.Canvas(list_frame, height=150, highlightthickness=0)
+        sub_scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.subtasks_canvas.yview)
+        self.subtasks_frame = tk.Frame(self.subtasks_canvas)
+        self.subtasks_frame.bind(
+            "<Configure>",
+            lambda e: self.subtasks_canvas.configure(scrollregion=self.subtasks_canvas.bbox("all"))
+        )
+        sub_window = self.subtasks_canvas.create_window((0, 0), window=self.subtasks_frame, anchor="nw")
+        self.subtasks_canvas.bind('<Configure>', lambda e: self.subtasks_canvas.itemconfig(sub_window, width=e.width))
+        self.subtasks_canvas.configure(yscrollcommand=sub_scrollbar.set)
+        self.subtasks_canvas.pack(side="left", fill="both", expand=True)
+        sub_scrollbar.pack(side="right", fill="y")
+
+        # Podúkoly se upravují v kopii a do úkolu se zapíší až v save_changes - živý dict
+        # drží TaskManager (počty podúkolů) a zavření okna bez uložení ho nesmí změnit
+        self.subtasks = [dict(sub) for sub in task_data.get("subtasks", [])]
+        self.subtask_rows = [] # zobrazené řádky ve stejném pořadí jako self.subtasks
+        self.row_pool = []     # skryté řádky k znovupoužití
         self.render_subtasks()
 
         self.add_frame = tk.Frame(self)
@@ -270,56 +1198,49 @@ class TaskDetailWindow(tk.Toplevel):
         self.save_btn.pack_forget()
 
     def open_calendar_popup(self):
-        top = tk.Toplevel(self)
-        top.title("Vyber datum")
-        top.geometry("300x250")
         try:
             current_date_str = self.deadline_entry.get()
             current_date = datetime.strptime(current_date_str, "%Y-%m-%d").date()
         except ValueError:
             current_date = datetime.now().date()
 
-        cal = Calendar(top, selectmode='day', 
-                       year=current_date.year, month=current_date.month, day=current_date.day,
-                       date_pattern='yyyy-mm-dd')
-        cal.pack(pady=20, padx=20, fill="both", expand=True)
+        # Kalendář se vytváří jen jednou pro celou aplikaci, pak se jen skrývá/zobrazuje
+        popup = TaskDetailWindow.calendar_popup
+        if popup is None or not popup.winfo_exists():
+            popup = TaskDetailWindow.calendar_popup = CalendarPopup(self.master, self.manager)
+        popup.open(current_date, self.set_deadline, self)
 
-        def set_date_and_close(event=None):
+    def set_deadline(self, date_str):
+        if self.winfo_exists():
             self.deadline_entry.delete(0, tk.END)
-            self.deadline_entry.insert(0, cal.get_date())
-            top.destroy()
-        cal.bind("<<CalendarSelected>>", set_date_and_close)
+            self.deadline_entry.insert(0, date_str)
 
     def render_subtasks(self):
-        for widget in self.subtasks_frame.winfo_children():
-            widget.destroy()
-        self.subtask_vars = []
-        
-        for i, sub in enumerate(self.task_data.get("subtasks", [])):
-            var = tk.BooleanVar(value=sub["done"])
-            self.subtask_vars.append(var)
-            
-            f = tk.Frame(self.subtasks_frame)
-            f.pack(fill="x", anchor="w")
-            
-            state = "disabled" if self.is_completed else "normal"
-            cb = tk.Checkbutton(f, text=sub["text"], variable=var, state=state)
-            cb.pack(side=tk.LEFT)
-            
-            if not self.is_completed:
-                tk.Button(f, text="x", font=("Arial", 8), fg="red", relief="flat", 
-                          command=lambda idx=i: self.remove_subtask(idx)).pack(side=tk.RIGHT)
+        """Úvodní vykreslení - jeden řádek na podúkol"""
+        for sub in self.subtasks:
+            self.show_subtask_row(sub)
+
+    def show_subtask_row(self, sub):
+        """Zobrazí podúkol v řádku z poolu (nebo nově vytvořeném) na konci seznamu"""
+        row = self.row_pool.pop() if self.row_pool else SubtaskRow(self.subtasks_frame, self.remove_subtask)
+        row.bind(sub, self.is_completed)
+        self.subtask_rows.append(row)
 
     def add_subtask(self):
         text = self.new_sub_entry.get()
         if text:
-            self.task_data["subtasks"].append({"text": text, "done": False})
+            sub = {"text": text, "done": False}
+            self.subtasks.append(sub)
             self.new_sub_entry.delete(0, tk.END)
-            self.render_subtasks()
+            self.show_subtask_row(sub)
+            self.subtasks_canvas.after_idle(lambda: self.subtasks_canvas.yview_moveto(1.0))
 
-    def remove_subtask(self, index):
-        del self.task_data["subtasks"][index]
-        self.render_subtasks()
+    def remove_subtask(self, row):
+        index = self.subtask_rows.index(row)
+        del self.subtasks[index]
+        del self.subtask_rows[index]
+        row.hide()
+        self.row_pool.append(row)
 
     def save_changes(self):
         self.task_data['title'] = self.title_entry.get()
@@ -327,9 +1248,9 @@ class TaskDetailWindow(tk.Toplevel):
         self.task_data['priority'] = self.prio_scale.get()
         self.task_data['description'] = self.desc_text.get("1.0", tk.END).strip()
         
-        for i, var in enumerate(self.subtask_vars):
-            if i < len(self.task_data["subtasks"]):
-                self.task_data["subtasks"][i]["done"] = var.get()
+        for sub, row in zip(self.subtasks, self.subtask_rows):
+            sub["done"] = row.var.get()
+        self.task_data["subtasks"] = self.subtasks
 
         self.manager.update_task(self.task_data)
         self.refresh_callback()
@@ -346,19 +1267,40 @@ class TaskApp(tk.Frame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
-        self.manager = TaskManager()
+        self.manager = open_task_manager()
         
         # --- STAV ŘAZENÍ ---
         # 0 = Off (Default), 1 = Descending, 2 = Ascending
         self.sort_state = 0 
         self.active_sort_col = None # 'priority', 'deadline' nebo None
 
+        # Vykreslené řádky podle id úkolu (pro částečné překreslení)
+        self.task_rows = {}
+        self.day_labels = {} # id -> label "X dní" u aktivních úkolů
+        self.rendered_order = ()
+        self.search_job = None # naplánované hledání (debounce psaní)
+        self.search_active = False # seznam je filtrovaný hledáním
+
         self.pack(fill="both", expand=True)
         
         header = tk.Frame(self)
         header.pack(fill="x", pady=10, padx=10)
         tk.Label(header, text="Task Priority Solver", font=("Arial", 16, "bold")).pack(side=tk.LEFT)
         tk.Button(header, text="+ Nový úkol", bg="lightblue", command=self.create_new_task).pack(side=tk.RIGHT)
+        tk.Button(header, text="↷ Znovu", command=self.redo).pack(side=tk.RIGHT, padx=2)
+        tk.Button(header, text="↶ Zpět", command=self.undo).pack(side=tk.RIGHT, padx=2)
+        if parent is not None:
+            parent.bind("<Control-z>", lambda e: self.undo())
+            parent.bind("<Control-y>", lambda e: self.redo())
+
+        # --- HLEDÁNÍ ---
+        search_frame = tk.Frame(self)
+        search_frame.pack(fill="x", padx=10, pady=(0, 5))
+        tk.Label(search_frame, text="🔍 Hledat:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        tk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill="x", expand=True, padx=5)
+        tk.Button(search_frame, text="✕", relief="flat", command=lambda: self.search_var.set("")).pack(side=tk.LEFT)
 
         self.canvas = tk.Canvas(self)
         self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
@@ -378,6 +1320,20 @@ class TaskApp(tk.Frame):
 
         self.refresh_list()
 
+        if self.manager.watch_disk:
+            # Externí změny tasks.json (jiná instance, synchronizace) načteme bez restartu
+            self.file_watcher = TaskFileWatcher(DATA_FILE, self.on_tasks_file_changed)
+            self.file_watcher.start()
+        else:
+            # Změny od ostatních klientů posílá daemon
+            self.manager.client.listen(self.on_remote_changes)
+
+        self.schedule_day_check()
+        self.after_idle(self.build_search_index_slice)
+
+        # Hlídání zaseknutí Tk smyčky (např. velký refresh_list)
+        self.lag_monitor = instrumentation.start_lag_monitor(self)
+
     def configure_grid_columns(self, container):
         container.grid_columnconfigure(0, weight=0, minsize=50) # Prio
         container.grid_columnconfigure(1, weight=1)             # Nazev
@@ -415,11 +1371,15 @@ class TaskApp(tk.Frame):
         
         return sym, bg
 
-    def refresh_list(self):
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
+    def build_sections(self):
+        """Rozdělí (vyhledané) úkoly na (aktivní, watchlist, splněné) a seřadí je dle aktuálního řazení"""
         tasks = self.manager.tasks
+        # Dotaz bez jediného slova délky trigramu by index nezúžil - bereme ho jako bez filtru
+        query = self.search_var.get()
+        self.search_active = any(len(word) >= TaskSearchIndex.N for word in normalize_search_text(query).split())
+        if self.search_active:
+            found_ids = self.manager.search(query)
+            tasks = [self.manager.get_task(task_id) for task_id in found_ids]
         
         active_tasks = [t for t in tasks if not t.get("completed_date") and not t.get("watchlist_date")]
         watchlist_tasks = [t for t in tasks if t.get("watchlist_date") and not t.get("completed_date")]
@@ -449,14 +1409,25 @@ class TaskApp(tk.Frame):
         watchlist_tasks.sort(key=lambda x: x['watchlist_date'], reverse=True)
         completed_tasks.sort(key=lambda x: x['completed_date'], reverse=True)
 
+        return active_tasks, watchlist_tasks, completed_tasks
+
+    @instrumented("refresh_list")
+    def refresh_list(self):
+        for widget in self.scrollable_frame.winfo_children():
+            widget.destroy()
+        self.task_rows = {}
+        self.day_labels = {}
+
+        active_tasks, watchlist_tasks, completed_tasks = self.build_sections()
+        self.rendered_order = self.section_order((active_tasks, watchlist_tasks, completed_tasks))
+
         # --- VYKRESLENÍ ---
         self.create_section_label("Aktivní úkoly")
         self.create_headers(is_active_section=True)
         
         if not active_tasks:
             tk.Label(self.scrollable_frame, text="Žádné aktivní úkoly", fg="grey").pack(pady=5)
-        for task in active_tasks:
-            self.create_task_row(task, status="active")
+        self.create_task_rows(active_tasks, status="active")
 
         # --- OSTATNÍ SEKCE ---
         self.create_separator()
@@ -464,14 +1435,109 @@ class TaskApp(tk.Frame):
         self.create_headers(is_active_section=False)
         if not watchlist_tasks:
              tk.Label(self.scrollable_frame, text="Žádné úkoly ve watchlistu", fg="grey").pack(pady=5)
-        for task in watchlist_tasks:
-            self.create_task_row(task, status="watchlist")
+        self.create_task_rows(watchlist_tasks, status="watchlist")
 
         self.create_separator()
         self.create_section_label("Splněné úkoly (Archiv)")
         self.create_headers(is_active_section=False)
-        for task in completed_tasks:
-            self.create_task_row(task, status="completed")
+        self.create_task_rows(completed_tasks, status="completed")
+
+    def create_task_rows(self, tasks, status):
+        """Výsledky hledání omezí na MAX_SECTION_ROWS řádků sekce, o zbytku jen informuje"""
+        if not self.search_active:
+            for task in tasks:
+                self.create_task_row(task, status=status)
+            return
+        for task in tasks[:MAX_SECTION_ROWS]:
+            self.create_task_row(task, status=status)
+        if len(tasks) > MAX_SECTION_ROWS:
+            tk.Label(self.scrollable_frame, text=f"… a dalších {len(tasks) - MAX_SECTION_ROWS} (upřesněte hledání)",
+                     fg="grey").pack(pady=5)
+
+    def schedule_search(self):
+        """Při psaní se seznam nepřekresluje po každém znaku, ale až po SEARCH_DEBOUNCE_MS ticha"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        self.refresh_list()
+
+    def build_search_index_slice(self):
+        """Vyhledávací index se staví po SEARCH_INDEX_SLICE dlouhých kouscích, okno mezitím reaguje"""
+        if not self.manager.build_search_index(budget=SEARCH_INDEX_SLICE):
+            self.after(1, self.build_search_index_slice)
+        elif self.search_active:
+            # Dosavadní výsledky byly jen z části úkolů
+            self.refresh_list()
+
+    def section_order(self, sections):
+        """Pořadí id úkolů v jednotlivých sekcích - podle něj poznáme, zda stačí překreslit řádky"""
+        return tuple(tuple(t["id"] for t in section) for section in sections)
+
+    def apply_task_changes(self, changed_ids, removed_ids=()):
+        """
+        Promítne změny konkrétních úkolů do seznamu. Pokud se nezměnilo složení ani pořadí
+        sekcí, přestaví jen dotčené řádky, jinak celý seznam.
+        """
+        if not changed_ids and not removed_ids:
+            return
+        sections = self.build_sections()
+        if removed_ids or self.section_order(sections) != self.rendered_order:
+            self.refresh_list()
+            return
+
+        statuses = ("active", "watchlist", "completed")
+        for status, section in zip(statuses, sections):
+            for task in section:
+                old_row = self.task_rows.get(task["id"])
+                if task["id"] in changed_ids and old_row is not None:
+                    self.create_task_row(task, status, before=old_row)
+                    old_row.destroy()
+
+    # --- PŘECHOD NA NOVÝ DEN ---
+    def schedule_day_check(self):
+        """Naplánuje další kontrolu data - nejpozději o půlnoci, jinak po DAY_CHECK_INTERVAL_MS"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        until_midnight_ms = int((midnight - now).total_seconds() * 1000) + 500
+        self.after(min(until_midnight_ms, DAY_CHECK_INTERVAL_MS), self.check_day_rollover)
+
+    def check_day_rollover(self):
+        if datetime.now().date() != self.manager.current_day:
+            changed_ids = self.manager.roll_over_day()
+            # Sloupec "dní" se posouvá všem aktivním úkolům - stačí přepsat text
+            for task_id, label in self.day_labels.items():
+                task = self.manager.get_task(task_id)
+                if task is not None and task_id not in changed_ids:
+                    label.config(text=f"{days_remaining(task['deadline'])} dní")
+            self.apply_task_changes(changed_ids)
+        self.schedule_day_check()
+
+    def on_tasks_file_changed(self):
+        """Volá watcher (z vlastního vlákna) po externí změně tasks.json"""
+        self.after(0, self.reload_external_changes)
+
+    # --- ZPĚT / ZNOVU ---
+    def undo(self):
+        result = self.manager.undo()
+        if result is not None:
+            self.apply_task_changes(*result)
+
+    def redo(self):
+        result = self.manager.redo()
+        if result is not None:
+            self.apply_task_changes(*result)
+
+    def on_remote_changes(self, tasks, removed_ids):
+        """Volá čtečka daemonu (z vlastního vlákna) se změnami od ostatních klientů"""
+        self.after(0, lambda: self.apply_task_changes(self.manager.merge_tasks(tasks),
+                                                      self.manager.drop_tasks(removed_ids)))
+
+    def reload_external_changes(self):
+        changed_ids, removed_ids = self.manager.reload_from_disk()
+        self.apply_task_changes(changed_ids, removed_ids)
 
     def create_section_label(self, text):
         f = tk.Frame(self.scrollable_frame, bg="#eeeeee")
@@ -519,7 +1585,7 @@ class TaskApp(tk.Frame):
         tk.Label(headers_frame, text="Info", font=("Arial", 9, "bold")).grid(row=0, column=3, sticky="w", padx=5)
         tk.Label(headers_frame, text="Akce", font=("Arial", 9, "bold")).grid(row=0, column=4, sticky="w", padx=5)
 
-    def create_task_row(self, task, status):
+    def create_task_row(self, task, status, before=None):
         if status == 'completed':
             color = "#d3d3d3"
             fg_color = "#666666"
@@ -534,8 +1600,12 @@ class TaskApp(tk.Frame):
             relief = "raised"
 
         row = tk.Frame(self.scrollable_frame, bg=color, pady=5, padx=5, bd=1, relief=relief)
-        row.pack(fill="x", pady=2, padx=5)
+        if before is not None:
+            row.pack(fill="x", pady=2, padx=5, before=before)
+        else:
+            row.pack(fill="x", pady=2, padx=5)
         self.configure_grid_columns(row)
+        self.task_rows[task["id"]] = row
 
         def on_click(e):
             TaskDetailWindow(self.parent, task, self.manager, self.refresh_list)
@@ -543,7 +1613,11 @@ class TaskApp(tk.Frame):
         l_prio = tk.Label(row, text=str(task['priority']), bg=color, fg=fg_color)
         l_prio.grid(row=0, column=0, sticky="nsew")
         
-        l_title = tk.Label(row, text=task['title'], bg=color, fg=fg_color, anchor="w", font=("Arial", 10, "bold"))
+        title_text = task['title']
+        done, total = self.manager.subtask_progress(task["id"])
+        if total:
+            title_text = f"{title_text}  [{done}/{total}]"
+        l_title = tk.Label(row, text=title_text, bg=color, fg=fg_color, anchor="w", font=("Arial", 10, "bold"))
         l_title.grid(row=0, column=1, sticky="nsew")
         
         l_dead = tk.Label(row, text=task['deadline'], bg=color, fg=fg_color)
@@ -559,6 +1633,8 @@ class TaskApp(tk.Frame):
             
         l_days = tk.Label(row, text=info_text, bg=color, fg=fg_color)
         l_days.grid(row=0, column=3, sticky="nsew")
+        if status == 'active':
+            self.day_labels[task["id"]] = l_days
 
         # --- TLAČÍTKA ---
         action_container = tk.Frame(row, bg=color) 
@@ -589,24 +1665,18 @@ class TaskApp(tk.Frame):
             widget.configure(cursor="hand2")
 
     def try_move_to_watchlist(self, task):
-        subtasks = task.get("subtasks", [])
-        if subtasks:
-            not_done = [s for s in subtasks if not s["done"]]
-            if not_done:
-                messagebox.showwarning("Nelze přesunout", "Nemáte hotové všechny podúkoly!")
-                return
+        if not self.manager.all_subtasks_done(task["id"]):
+            messagebox.showwarning("Nelze přesunout", "Nemáte hotové všechny podúkoly!")
+            return
         
         if messagebox.askyesno("Watchlist", f"Přesunout úkol '{task['title']}' do Watchlistu ke kontrole?"):
             self.manager.move_to_watchlist(task["id"])
             self.refresh_list()
 
     def try_complete_directly(self, task):
-        subtasks = task.get("subtasks", [])
-        if subtasks:
-            not_done = [s for s in subtasks if not s["done"]]
-            if not_done:
-                messagebox.showwarning("Nelze splnit", "Nemáte hotové všechny podúkoly!")
-                return
+        if not self.manager.all_subtasks_done(task["id"]):
+            messagebox.showwarning("Nelze splnit", "Nemáte hotové všechny podúkoly!")
+            return
         
         if messagebox.askyesno("Hotovo", f"Splnit úkol '{task['title']}' IHNED (bez Watchlistu)?"):
             self.manager.mark_as_completed_directly(task["id"])
@@ -623,18 +1693,7 @@ class TaskApp(tk.Frame):
             self.refresh_list()
 
     def create_new_task(self):
-        dummy_task = {
-            "id": str(uuid.uuid4()),
-            "title": "Nový úkol",
-            "deadline": datetime.now().strftime("%Y-%m-%d"),
-            "priority": 10,
-            "description": "",
-            "subtasks": [],
-            "completed_date": None,
-            "watchlist_date": None
-        }
-        self.manager.tasks.append(dummy_task)
-        self.manager.save_tasks()
+        dummy_task = self.manager.add_task("Nový úkol", datetime.now().strftime("%Y-%m-%d"), 10)
         self.refresh_list()
         TaskDetailWindow(self.parent, dummy_task, self.manager, self.refresh_list)
 
@@ -642,5 +1701,6 @@ if __name__ == "__main__":
     root = tk.Tk()
     root.title("Task Priority Solver")
     root.geometry("750x700")
+    instrumentation.install(root)
     app = TaskApp(root)
     root.mainloop()
\ No newline at end of file
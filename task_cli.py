@@ -0,0 +1,330 @@
+import argparse
+import csv
+import json
+import sys
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+
+from taks_priority_solver import open_task_manager
+
+# Sloupce CSV exportu/importu (podúkoly jako JSON v jednom sloupci)
+CSV_FIELDS = ["id", "title", "deadline", "priority", "description", "subtasks", "completed_date", "watchlist_date"]
+STATUSES = ("active", "watchlist", "completed")
+
+
+def task_status(task):
+    if task.get("completed_date"):
+        return "completed"
+    if task.get("watchlist_date"):
+        return "watchlist"
+    return "active"
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def open_input(path):
+    if path == "-":
+        return nullcontext(sys.stdin)
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def open_output(path):
+    if path in (None, "-"):
+        return nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+# --- PROUDOVÉ ČTENÍ / ZÁPIS ---
+
+def read_records(f, fmt):
+    """
+    Čte záznamy po jednom řádku - vstup nikdy není celý v paměti.
+    Vrací (číslo řádku, surový záznam), rozbor dělá parse_record.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield line_number, line
+
+
+def parse_record(raw, fmt):
+    """Surový záznam -> úkol. Neplatný záznam (JSON, priorita, datum) vyhodí ValueError."""
+    if fmt == "csv":
+        record = dict(raw)
+        if record.get("subtasks"):
+            record["subtasks"] = json.loads(record["subtasks"])
+    else:
+        record = json.loads(raw)
+    if not isinstance(record, dict):
+        raise ValueError("záznam není JSON objekt")
+    return normalize_record(record)
+
+
+def text_field(record, field, default):
+    value = record.get(field)
+    if value is None or value == "":
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f"{field} musí být text, ne {value!r}")
+    return value
+
+
+def normalize_subtask(sub):
+    """Podúkol ve tvaru z GUI: {"text": str, "done": bool}"""
+    if not isinstance(sub, dict) or not isinstance(sub.get("text"), str):
+        raise ValueError(f"neplatný podúkol {sub!r}")
+    done = sub.get("done", False)
+    if not isinstance(done, bool):
+        raise ValueError(f"neplatný stav podúkolu {done!r}")
+    return {"text": sub["text"], "done": done}
+
+
+def normalize_record(record):
+    """
+    Doplní chybějící pole, aby záznam odpovídal úkolu z TaskManager.add_task.
+    Pole se špatným typem nebo hodnotou vyhodí ValueError - do tasks.json se nesmí dostat.
+    """
+    priority = record.get("priority")
+    if priority is None or priority == "":
+        priority = 10
+    if isinstance(priority, bool):
+        raise ValueError(f"neplatná priorita {priority!r}")
+    try:
+        priority = int(priority)
+    except (TypeError, ValueError):
+        raise ValueError(f"neplatná priorita {priority!r}")
+    subtasks = record.get("subtasks") or []
+    if not isinstance(subtasks, list):
+        raise ValueError("podúkoly musí být seznam")
+    task = {
+        "id": text_field(record, "id", None) or str(uuid.uuid4()),
+        "title": text_field(record, "title", "Bez názvu"),
+        "deadline": text_field(record, "deadline", datetime.now().strftime("%Y-%m-%d")),
+        "priority": max(1, min(20, priority)),
+        "description": text_field(record, "description", ""),
+        "subtasks": [normalize_subtask(sub) for sub in subtasks],
+        "completed_date": text_field(record, "completed_date", None),
+        "watchlist_date": text_field(record, "watchlist_date", None),
+    }
+    for field in ("deadline", "completed_date", "watchlist_date"):
+        if task[field] is not None:
+            try:
+                datetime.strptime(task[field], "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"neplatné datum {field}={task[field]!r}")
+    return task
+
+
+class RecordWriter:
+    def __init__(self, f, fmt):
+        self.f = f
+        self.fmt = fmt
+        if fmt == "csv":
+            self.writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, task):
+        if self.fmt == "csv":
+            row = dict(task)
+            row["subtasks"] = json.dumps(task.get("subtasks", []), ensure_ascii=False)
+            self.writer.writerow(row)
+        elif self.fmt == "table":
+            self.f.write(f"{task['priority']:>4}  {task['deadline']:<10}  {task_status(task):<9}  {task['title']}\n")
+        else:
+            self.f.write(json.dumps(task, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+# --- FILTRY ---
+
+FILTERS = ("id", "status", "search", "deadline_before", "deadline_after", "min_priority", "max_priority")
+
+
+def add_filter_arguments(parser, modifies=False):
+    """modifies=True - příkaz mění data, bez filtru musí mít výslovně --all"""
+    if modifies:
+        parser.add_argument("--all", action="store_true", help="Provést na všech úkolech (bez filtru)")
+    parser.add_argument("--id", action="append", help="ID úkolu (lze opakovat)")
+    parser.add_argument("--status", choices=STATUSES, help="Stav úkolu")
+    parser.add_argument("--search", help="Fulltext v názvu, popisu a podúkolech")
+    parser.add_argument("--deadline-before", help="Deadline do (včetně), YYYY-MM-DD")
+    parser.add_argument("--deadline-after", help="Deadline od (včetně), YYYY-MM-DD")
+    parser.add_argument("--min-priority", type=int)
+    parser.add_argument("--max-priority", type=int)
+
+
+def has_filters(args):
+    return any(getattr(args, name) is not None for name in FILTERS)
+
+
+def select_tasks(manager, args):
+    """Vrací úkoly vyhovující filtrům (generátor)"""
+    if args.id:
+        candidates = (manager.get_task(task_id) for task_id in args.id)
+    elif args.search:
+        found = manager.search_index.search(args.search) or set()
+        candidates = (manager.get_task(task_id) for task_id in found)
+    else:
+        candidates = iter(list(manager.tasks))
+
+    for task in candidates:
+        if task is None:
+            continue
+        if args.status and task_status(task) != args.status:
+            continue
+        if args.deadline_before and task["deadline"] > args.deadline_before:
+            continue
+        if args.deadline_after and task["deadline"] < args.deadline_after:
+            continue
+        if args.min_priority is not None and task["priority"] < args.min_priority:
+            continue
+        if args.max_priority is not None and task["priority"] > args.max_priority:
+            continue
+        yield task
+
+
+# --- PŘÍKAZY ---
+
+def cmd_import(manager, args):
+    fmt = detect_format(args.file, args.format)
+    added = updated = skipped = 0
+    with open_input(args.file) as f, manager.batch():
+        for line_number, raw in read_records(f, fmt):
+            try:
+                task = parse_record(raw, fmt)
+            except ValueError as e:
+                # Vadný řádek přeskočíme, zbytek importu proběhne
+                print(f"Řádek {line_number} přeskočen: {e}", file=sys.stderr)
+                skipped += 1
+                continue
+            if manager.get_task(task["id"]) is not None:
+                manager.update_task(task)
+                updated += 1
+            else:
+                manager.insert_task(task)
+                added += 1
+    print(f"Importováno: {added} nových, {updated} aktualizovaných, {skipped} přeskočeno", file=sys.stderr)
+
+
+def cmd_export(manager, args):
+    fmt = detect_format(args.output or "", args.format)
+    with open_output(args.output) as f:
+        writer = RecordWriter(f, fmt)
+        for task in select_tasks(manager, args):
+            writer.write(task)
+
+
+def cmd_query(manager, args):
+    writer = RecordWriter(sys.stdout, args.format)
+    for task in select_tasks(manager, args):
+        writer.write(task)
+
+
+def subtasks_block(manager, task, args):
+    """Stejně jako GUI: aktivní úkol s nehotovými podúkoly nejde splnit ani přesunout (bez --force)"""
+    return not args.force and task_status(task) == "active" and not manager.all_subtasks_done(task["id"])
+
+
+def cmd_complete(manager, args):
+    task_ids, blocked = [], 0
+    for task in select_tasks(manager, args):
+        if task_status(task) == "completed":
+            continue
+        if subtasks_block(manager, task, args):
+            blocked += 1
+            continue
+        task_ids.append(task["id"])
+    with manager.batch():
+        count = manager.mark_many_completed(task_ids)
+    print(f"Splněno: {count}", file=sys.stderr)
+    if blocked:
+        print(f"Přeskočeno kvůli nehotovým podúkolům: {blocked} (vynutit --force)", file=sys.stderr)
+
+
+def cmd_watchlist(manager, args):
+    count = blocked = 0
+    with manager.batch():
+        for task in list(select_tasks(manager, args)):
+            if task_status(task) != "active":
+                continue
+            if subtasks_block(manager, task, args):
+                blocked += 1
+                continue
+            manager.move_to_watchlist(task["id"])
+            count += 1
+    print(f"Přesunuto do watchlistu: {count}", file=sys.stderr)
+    if blocked:
+        print(f"Přeskočeno kvůli nehotovým podúkolům: {blocked} (vynutit --force)", file=sys.stderr)
+
+
+def cmd_prioritize(manager, args):
+    count = 0
+    with manager.batch():
+        for task in list(select_tasks(manager, args)):
+            new_prio = args.set if args.set is not None else task["priority"] + args.add
+            new_prio = max(1, min(20, new_prio))
+            if new_prio != task["priority"]:
+                task["priority"] = new_prio
+                manager.update_task(task)
+                count += 1
+    print(f"Změněna priorita: {count}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Hromadné operace s úkoly Task Priority Solveru bez GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="Import úkolů z JSON Lines / CSV (existující id se aktualizují)")
+    p.add_argument("file", help="Vstupní soubor, '-' = stdin")
+    p.add_argument("--format", choices=("jsonl", "csv"))
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="Export úkolů do JSON Lines / CSV")
+    p.add_argument("--output", "-o", help="Výstupní soubor (výchozí stdout)")
+    p.add_argument("--format", choices=("jsonl", "csv"))
+    add_filter_arguments(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("query", help="Vypíše úkoly vyhovující filtrům")
+    p.add_argument("--format", choices=("table", "jsonl", "csv"), default="table")
+    add_filter_arguments(p)
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("complete", help="Hromadně splní úkoly")
+    p.add_argument("--force", action="store_true", help="Splnit i úkoly s nehotovými podúkoly")
+    add_filter_arguments(p, modifies=True)
+    p.set_defaults(func=cmd_complete)
+
+    p = sub.add_parser("watchlist", help="Hromadně přesune aktivní úkoly do watchlistu")
+    p.add_argument("--force", action="store_true", help="Přesunout i úkoly s nehotovými podúkoly")
+    add_filter_arguments(p, modifies=True)
+    p.set_defaults(func=cmd_watchlist)
+
+    p = sub.add_parser("prioritize", help="Hromadně změní prioritu")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument("--set", type=int, help="Nastavit prioritu (1-20)")
+    group.add_argument("--add", type=int, help="Přičíst k prioritě (i záporně)")
+    add_filter_arguments(p, modifies=True)
+    p.set_defaults(func=cmd_prioritize)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "all", None) is False and not has_filters(args):
+        parser.error(f"{args.command}: zadejte filtr (--id, --status, --search, ...) nebo --all pro všechny úkoly")
+    manager = open_task_manager()
+    args.func(manager, args)
+
+
+if __name__ == "__main__":
+    main()
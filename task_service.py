@@ -0,0 +1,171 @@
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+
+from taks_priority_solver import DATA_FILE, TaskManager, TaskFileWatcher, TaskServiceClient, SERVICE_SOCKET, encode_message
+
+# Za jak dlouho po poslední změně zapsat tasks.json (zápisy se dávkují)
+FLUSH_DELAY = 1.0
+
+
+class ServiceTaskManager(TaskManager):
+    """Historii Zpět/Znovu vedou klienti - daemon soubor historie nečte ani nepřepisuje"""
+    keep_history = False
+
+
+class TaskService:
+    """
+    Volitelný lokální daemon, který drží stav TaskManageru v paměti.
+    Klienti (TaskApp, WorkDayApp) se připojí přes Unix domain socket, dostanou
+    aktuální úkoly bez čtení tasks.json a daemon jim posílá změny ostatních.
+    Externí změny tasks.json (synchronizace, ruční úprava) daemon načte a rozešle všem.
+
+    Protokol - jeden kompaktní JSON objekt na řádek:
+      {"op": "subscribe"}                         -> {"op": "snapshot", "tasks": [...]}
+      {"op": "get"}                               -> {"op": "snapshot", "tasks": [...]} (bez odběru)
+      {"op": "put", "tasks": [...], "removed": []} -> ostatním odběratelům {"op": "changed", ...}
+    """
+    def __init__(self, path=SERVICE_SOCKET):
+        self.path = path
+        self.manager = ServiceTaskManager()
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}       # socket -> rozpracovaný řádek
+        self.subscribers = set()
+        self.flush_at = None
+        # Watcher volá callback ze svého vlákna - do smyčky selectoru ho předáme
+        # zápisem bajtu do socketpair (self-pipe), reload pak běží ve vlákně daemonu
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_send.setblocking(False)
+        self.watcher = TaskFileWatcher(DATA_FILE, self.on_file_changed)
+
+    def serve_forever(self):
+        if TaskServiceClient.connect(self.path) is not None:
+            print("Daemon už běží.")
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)  # socket po spadlém daemonu
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen()
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, self.accept)
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ, self.reload_from_disk)
+        # SIGTERM ukončí smyčku výjimkou, takže batch() zapíše čekající změny a socket se smaže
+        signal.signal(signal.SIGTERM, self.on_sigterm)
+        self.watcher.start()
+        print(f"Daemon naslouchá na {self.path}")
+
+        try:
+            # Celý běh je jedna dávka - na disk se zapisuje jen v flush()
+            with self.manager.batch():
+                while True:
+                    timeout = None
+                    if self.flush_at is not None:
+                        timeout = max(0, self.flush_at - time.monotonic())
+                    for key, _ in self.selector.select(timeout):
+                        key.data(key.fileobj)
+                    if self.flush_at is not None and time.monotonic() >= self.flush_at:
+                        self.manager.flush()
+                        self.flush_at = None
+        finally:
+            self.watcher.stop()
+            server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def on_sigterm(self, signum, frame):
+        raise SystemExit(0)
+
+    def on_file_changed(self):
+        """Callback watcheru (jeho vlákno) - jen probudí smyčku selectoru"""
+        try:
+            self.wakeup_send.send(b"\0")
+        except OSError:
+            pass  # buffer je plný, smyčka už o změně ví
+
+    def reload_from_disk(self, wakeup):
+        """Načte externí změnu tasks.json (čekající změny klientů zůstanou) a rozešle ji odběratelům"""
+        try:
+            wakeup.recv(4096)
+        except OSError:
+            pass
+        changed, removed = self.manager.reload_from_disk()
+        if changed or removed:
+            self.broadcast(None, {
+                "op": "changed",
+                "tasks": [self.manager.get_task(task_id) for task_id in changed],
+                "removed": sorted(removed),
+            })
+
+    def accept(self, server):
+        conn, _ = server.accept()
+        self.buffers[conn] = b""
+        self.selector.register(conn, selectors.EVENT_READ, self.read)
+
+    def read(self, conn):
+        try:
+            data = conn.recv(65536)
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(conn)
+            return
+        *lines, self.buffers[conn] = (self.buffers[conn] + data).split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    self.handle(conn, json.loads(line))
+                except (ValueError, KeyError, OSError) as e:
+                    print(f"Chyba zprávy: {e}")
+
+    def disconnect(self, conn):
+        self.selector.unregister(conn)
+        self.buffers.pop(conn, None)
+        self.subscribers.discard(conn)
+        conn.close()
+
+    def handle(self, conn, message):
+        op = message.get("op")
+        if op in ("subscribe", "get"):
+            conn.sendall(encode_message({"op": "snapshot", "tasks": self.manager.tasks}))
+            if op == "subscribe":
+                self.subscribers.add(conn)
+        elif op == "put":
+            # Změny klientů jsou do flush() čekající - reload z disku je nesmí zahodit
+            changed = self.manager.merge_tasks(message.get("tasks", []), pending=True)
+            removed = self.manager.drop_tasks(message.get("removed", []), pending=True)
+            if changed or removed:
+                self.manager.save_tasks()
+                if self.flush_at is None:
+                    self.flush_at = time.monotonic() + FLUSH_DELAY
+                self.broadcast(conn, {
+                    "op": "changed",
+                    "tasks": [self.manager.get_task(task_id) for task_id in changed],
+                    "removed": sorted(removed),
+                })
+
+    def broadcast(self, sender, message):
+        data = encode_message(message)
+        for conn in list(self.subscribers):
+            if conn is sender:
+                continue
+            try:
+                conn.sendall(data)
+            except OSError:
+                self.disconnect(conn)
+
+
+if __name__ == "__main__":
+    if not hasattr(socket, "AF_UNIX"):
+        print("Tento systém nepodporuje Unix domain sockety, daemon nelze spustit.")
+        sys.exit(1)
+    try:
+        TaskService().serve_forever()
+    except KeyboardInterrupt:
+        pass